@@ -0,0 +1,162 @@
+"""
+Connection-count vs. latency comparison between the server engines.
+
+Starts ``server.py`` in each mode on a loopback port, parks a number of idle
+connections on it and measures the round-trip latency seen by a handful of
+active clients, together with the server's thread count and resident memory.
+
+Usage:
+    python -m benchmarks.connections --counts 0,250,500,1000 --modes threaded,asyncio
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from protocol import FrameReader, MSG_SNAPSHOT, decode_snapshot, encode_input, read_frame
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(mode, port, extra_args=()):
+    """Start the server in a subprocess and wait until it is listening."""
+    proc = subprocess.Popen(
+        [sys.executable, "-u", "server.py", "--mode", mode, "--host", "127.0.0.1", "--port", str(port)]
+        + list(extra_args),
+        cwd=ROOT,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+    )
+    for line in proc.stdout:
+        if "Server started" in line:
+            break
+    else:
+        raise RuntimeError(f"{mode} server exited before listening on port {port}")
+    # Keep draining stdout so the server never blocks on a full pipe
+    threading.Thread(target=proc.stdout.read, daemon=True).start()
+    return proc
+
+
+def server_stats(pid):
+    """
+    Return (threads, rss_kb) for a process and its children, such as lobby
+    workers, or (None, None) if unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f)
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(child) for child in f.read().split()]
+    except OSError:
+        return None, None
+    threads, rss_kb = int(fields["Threads"]), int(fields["VmRSS"].split()[0])
+    for child in children:
+        child_threads, child_rss_kb = server_stats(child)
+        if child_threads is not None:
+            threads += child_threads
+            rss_kb += child_rss_kb
+    return threads, rss_kb
+
+
+def connect(port, timeout=5.0):
+    """Connect to the server, retrying while it is still starting to listen."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return socket.create_connection(("127.0.0.1", port))
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def open_idle(port, count):
+    """Open ``count`` connections that never send anything."""
+    return [connect(port) for _ in range(count)]
+
+
+def probe(port, rounds, latencies):
+    """Play ``rounds`` request/response exchanges and record their latency."""
+    with connect(port) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        reader = FrameReader()
+        read_frame(sock, reader)  # hello
+        for seq in range(1, rounds + 1):
+            start = time.perf_counter()
+            sock.sendall(encode_input(0, seq, start, 0))
+            # Skip snapshots broadcast before the server applied this input
+            applied = 0
+            while applied < seq:
+                msg_type, payload = read_frame(sock, reader)
+                if msg_type == MSG_SNAPSHOT:
+                    applied = decode_snapshot(payload)[2]
+            latencies.append(time.perf_counter() - start)
+
+
+def run(mode, port, count, probes, rounds):
+    proc = start_server(mode, port)
+    try:
+        idle = open_idle(port, count)
+        time.sleep(0.5)  # let the server accept the backlog
+        latencies = []
+        workers = [
+            threading.Thread(target=probe, args=(port, rounds, latencies))
+            for _ in range(probes)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        threads, rss_kb = server_stats(proc.pid)
+        for conn in idle:
+            conn.close()
+    finally:
+        proc.kill()
+        proc.wait()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "connections": count,
+        "threads": threads,
+        "rss_kb": rss_kb,
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modes", default="threaded,asyncio")
+    parser.add_argument("--counts", default="0,250,500,1000")
+    parser.add_argument("--probes", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--port", type=int, default=5600)
+    parser.add_argument("--json", action="store_true", help="print results as JSON lines")
+    args = parser.parse_args()
+
+    if not args.json:
+        print(f"{'mode':<10}{'conns':>8}{'threads':>9}{'rss MB':>9}{'p50 ms':>10}{'p99 ms':>10}")
+    port = args.port
+    for mode in args.modes.split(","):
+        for count in (int(c) for c in args.counts.split(",")):
+            result = run(mode, port, count, args.probes, args.rounds)
+            port += 1
+            if args.json:
+                print(json.dumps(result))
+                continue
+            rss = f"{result['rss_kb'] / 1024:.1f}" if result["rss_kb"] else "-"
+            print(
+                f"{mode:<10}{count:>8}{result['threads'] or '-':>9}{rss:>9}"
+                f"{result['p50_ms']:>10}{result['p99_ms']:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
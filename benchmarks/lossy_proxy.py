@@ -0,0 +1,184 @@
+"""
+A loopback proxy that adds latency, jitter and loss in front of the server.
+
+Forwards TCP connections and UDP datagrams from ``--listen`` to ``--target``
+on the same port number, so a client pointed at the proxy reaches the server
+over both channels. Datagrams are dropped outright with probability
+``--loss``; TCP cannot lose data, so a "lost" chunk instead arrives an
+``--rto`` late and holds back everything behind it, the way a retransmission
+stalls a real stream.
+
+Point it at a single-room server: a lobby's redirect would send clients
+around it.
+
+Usage:
+    python server.py --mode asyncio --udp --port 6000 &
+    python -m benchmarks.lossy_proxy --listen 6001 --target 6000 --delay 25 --loss 0.05 &
+    python -m benchmarks.swarm --server 127.0.0.1 --port 6001 --udp --counts 10
+"""
+import argparse
+import asyncio
+import random
+
+
+class Impairment:
+    """Draws the fate of each chunk or datagram from the proxy's settings."""
+
+    def __init__(self, delay, jitter, loss, rto, seed=None):
+        """
+        Args:
+            delay (float): One-way delay in seconds.
+            jitter (float): Extra delay of up to this many seconds.
+            loss (float): Probability that a chunk or datagram is lost.
+            rto (float): Extra delay of a lost TCP chunk, in seconds.
+            seed (int, optional): Seed for the random source.
+        """
+        self.delay = delay
+        self.jitter = jitter
+        self.loss = loss
+        self.rto = rto
+        self.rng = random.Random(seed)
+
+    def latency(self):
+        """A one-way delay for a chunk that arrives first time."""
+        return self.delay + self.rng.uniform(0, self.jitter)
+
+    def lost(self):
+        """Whether the next chunk or datagram is lost."""
+        return self.rng.random() < self.loss
+
+
+async def pipe(reader, writer, impairment):
+    """Copy a stream in order, delaying each chunk and stalling on losses."""
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+
+    async def deliver():
+        while True:
+            due, data = await chunks.get()
+            if data is None:
+                break
+            await asyncio.sleep(max(0.0, due - loop.time()))
+            writer.write(data)
+            await writer.drain()
+
+    delivery = asyncio.ensure_future(deliver())
+    last_due = 0.0
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            due = loop.time() + impairment.latency()
+            if impairment.lost():
+                due += impairment.rto
+            # a stream never reorders: nothing overtakes a stalled chunk
+            last_due = max(last_due, due)
+            chunks.put_nowait((last_due, data))
+    except OSError:
+        pass
+    finally:
+        chunks.put_nowait((0.0, None))
+        try:
+            await delivery
+        except OSError:
+            pass
+        writer.close()
+
+
+async def proxy_stream(client_reader, client_writer, target, impairment):
+    """Forward one TCP connection to the target in both directions."""
+    try:
+        server_reader, server_writer = await asyncio.open_connection(*target)
+    except OSError as e:
+        print("Error:", str(e))
+        client_writer.close()
+        return
+    await asyncio.gather(
+        pipe(client_reader, server_writer, impairment),
+        pipe(server_reader, client_writer, impairment),
+    )
+
+
+class Upstream(asyncio.DatagramProtocol):
+    """The proxy's datagram socket towards the server for one client."""
+
+    def __init__(self, relay, client_addr):
+        self.relay = relay
+        self.client_addr = client_addr
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.relay.forward(self.relay.transport.sendto, data, self.client_addr)
+
+
+class DatagramRelay(asyncio.DatagramProtocol):
+    """Forwards datagrams between clients and the target, one upstream socket per client."""
+
+    def __init__(self, target, impairment):
+        self.target = target
+        self.impairment = impairment
+        self.transport = None
+        self.upstreams = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def forward(self, send, data, *addr):
+        """Drop ``data`` or send it after a delay; datagrams may reorder."""
+        if self.impairment.lost():
+            return
+        loop = asyncio.get_running_loop()
+        loop.call_later(self.impairment.latency(), send, data, *addr)
+
+    def datagram_received(self, data, addr):
+        upstream = self.upstreams.get(addr)
+        if upstream is None:
+            upstream = self.upstreams[addr] = Upstream(self, addr)
+            asyncio.ensure_future(self.open_upstream(upstream, data))
+            return
+        if upstream.transport is not None:
+            self.forward(upstream.transport.sendto, data)
+
+    async def open_upstream(self, upstream, first):
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: upstream, remote_addr=self.target)
+        self.forward(upstream.transport.sendto, first)
+
+
+async def run(listen, target, impairment):
+    loop = asyncio.get_running_loop()
+    await loop.create_datagram_endpoint(lambda: DatagramRelay(target, impairment), local_addr=listen)
+    server = await asyncio.start_server(
+        lambda reader, writer: proxy_stream(reader, writer, target, impairment), *listen
+    )
+    print(f"Proxying {listen[0]}:{listen[1]} -> {target[0]}:{target[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--listen", type=int, required=True, help="port to listen on")
+    parser.add_argument("--target-host", default="127.0.0.1")
+    parser.add_argument("--target", type=int, required=True, help="server port to forward to")
+    parser.add_argument("--delay", type=float, default=0.0, help="one-way delay (ms)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay up to (ms)")
+    parser.add_argument("--loss", type=float, default=0.0, help="loss probability (0-1)")
+    parser.add_argument("--rto", type=float, default=200.0, help="stall of a lost TCP chunk (ms)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    impairment = Impairment(args.delay / 1000, args.jitter / 1000, args.loss, args.rto / 1000, args.seed)
+    try:
+        asyncio.run(run((args.host, args.listen), (args.target_host, args.target), impairment))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
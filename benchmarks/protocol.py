@@ -0,0 +1,175 @@
+"""
+Message size and encode/decode time: binary protocol vs. the old pickle path.
+
+Builds a world of N players and M coins and measures the upstream message
+(pickled Player vs. input frame) and the per-client reply (pickled reply dict
+vs. a keyframe snapshot, and vs. a delta snapshot where a tenth of the players
+moved).
+
+It also times one tick's fan-out of a delta snapshot to every player: each
+reply encoded on its own, vs. the records encoded once and shared behind a
+per-player header.
+
+Usage:
+    python -m benchmarks.protocol --players 2,10,50 --coins 5
+"""
+import argparse
+import json
+import pickle
+import time
+import timeit
+import uuid
+
+from game_config import PLAYER_WIDTH, PLAYER_HEIGHT, generate_coin, get_random_character, get_random_pos
+from player import Player
+from protocol import (
+    HEADER,
+    decode_input,
+    decode_snapshot,
+    encode_delta,
+    encode_input,
+    encode_snapshot,
+    encode_snapshot_header,
+)
+from snapshot import capture_state, diff_states
+
+
+def make_world(players, coins):
+    world = []
+    for _ in range(players):
+        player_id = str(uuid.uuid4())
+        world.append(
+            Player(player_id, *get_random_pos(), PLAYER_WIDTH, PLAYER_HEIGHT, get_random_character())
+        )
+    return world, {coin_id: generate_coin() for coin_id in range(1, coins + 1)}
+
+
+def time_us(func, number):
+    """Return the mean time of ``func`` in microseconds."""
+    return round(timeit.timeit(func, number=number) / number * 1e6, 2)
+
+
+def measure(players, coins, number):
+    world, coin_list = make_world(players + 1, coins)
+    player, opponents = world[0], world[1:]
+
+    reply = {
+        "winner": None,
+        "opponents": {opp.id: opp for opp in opponents},
+        "coins": list(coin_list.values()),
+        "multiplier": 0,
+    }
+    pickled_input = pickle.dumps(player)
+    pickled_reply = pickle.dumps(reply)
+    input_frame = encode_input(0, 1, time.monotonic(), 0)
+
+    base = capture_state(world, coin_list)
+    for opp in opponents[: max(1, players // 10)]:
+        opp.x += 5
+    state = capture_state(world, coin_list)
+    keyframe = diff_states(None, state)
+    delta = diff_states(base, state)
+    keyframe_frame = encode_snapshot(2, 0, 1, 0, keyframe)
+    delta_frame = encode_snapshot(2, 1, 1, 0, delta)
+
+    def snapshot_result(message, snapshot_frame, snapshot_delta):
+        return {
+            "message": message,
+            "players": players,
+            "coins": coins,
+            "pickle_bytes": len(pickled_reply),
+            "binary_bytes": len(snapshot_frame),
+            "pickle_encode_us": time_us(lambda: pickle.dumps(reply), number),
+            "binary_encode_us": time_us(
+                lambda: encode_snapshot(2, 1, 1, 0, snapshot_delta), number
+            ),
+            "pickle_decode_us": time_us(lambda: pickle.loads(pickled_reply), number),
+            "binary_decode_us": time_us(
+                lambda: decode_snapshot(snapshot_frame[HEADER.size :]), number
+            ),
+        }
+
+    return [
+        {
+            "message": "input",
+            "players": players,
+            "coins": coins,
+            "pickle_bytes": len(pickled_input),
+            "binary_bytes": len(input_frame),
+            "pickle_encode_us": time_us(lambda: pickle.dumps(player), number),
+            "binary_encode_us": time_us(lambda: encode_input(0, 1, 0.0, 0), number),
+            "pickle_decode_us": time_us(lambda: pickle.loads(pickled_input), number),
+            "binary_decode_us": time_us(lambda: decode_input(input_frame[HEADER.size :]), number),
+        },
+        snapshot_result("keyframe", keyframe_frame, keyframe),
+        snapshot_result("delta", delta_frame, delta),
+    ]
+
+
+def measure_fanout(players, coins, number):
+    world, coin_list = make_world(players, coins)
+    base = capture_state(world, coin_list)
+    for player in world[: max(1, players // 10)]:
+        player.x += 5
+    state = capture_state(world, coin_list)
+
+    def per_client():
+        return [
+            encode_snapshot(2, 1, input_seq, 0, diff_states(base, state))
+            for input_seq in range(players)
+        ]
+
+    def shared():
+        encoded = encode_delta(diff_states(base, state))
+        return [
+            [encode_snapshot_header(2, 1, input_seq, 0, encoded), encoded.body]
+            for input_seq in range(players)
+        ]
+
+    return {
+        "message": "fanout",
+        "players": players,
+        "coins": coins,
+        "per_client_us": time_us(per_client, max(1, number // players)),
+        "shared_us": time_us(shared, max(1, number // players)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", default="2,10,50")
+    parser.add_argument("--coins", type=int, default=5)
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--json", action="store_true", help="print results as JSON lines")
+    args = parser.parse_args()
+
+    if not args.json:
+        print(
+            f"{'message':<10}{'players':>8}{'pickle B':>10}{'binary B':>10}"
+            f"{'pickle enc us':>15}{'binary enc us':>15}{'pickle dec us':>15}{'binary dec us':>15}"
+        )
+    for players in (int(p) for p in args.players.split(",")):
+        for result in measure(players, args.coins, args.number):
+            if args.json:
+                print(json.dumps(result))
+                continue
+            print(
+                f"{result['message']:<10}{players:>8}"
+                f"{result['pickle_bytes']:>10}{result['binary_bytes']:>10}"
+                f"{result['pickle_encode_us']:>15}{result['binary_encode_us']:>15}"
+                f"{result['pickle_decode_us']:>15}{result['binary_decode_us']:>15}"
+            )
+
+    fanouts = [measure_fanout(int(p), args.coins, args.number) for p in args.players.split(",")]
+    if not args.json:
+        print()
+        print(f"{'players':>8}{'per-client tick us':>20}{'shared tick us':>16}")
+    for result in fanouts:
+        if args.json:
+            print(json.dumps(result))
+            continue
+        print(f"{result['players']:>8}{result['per_client_us']:>20}{result['shared_us']:>16}")
+
+
+if __name__ == "__main__":
+    main()
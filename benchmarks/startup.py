@@ -0,0 +1,90 @@
+"""
+Import time of the game modules and time for the server to start listening.
+
+Import times come from ``python -X importtime`` in a fresh interpreter:
+"self" is the module's own top-level code, "cumulative" adds everything it
+pulls in that the interpreter had not already loaded. Startup time runs
+``server.py`` in each mode and waits for it to report that it is listening.
+
+Usage:
+    python -m benchmarks.startup --modules game_config,protocol,server --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.connections import ROOT, start_server
+
+
+def import_time_us(module, repeat):
+    """Return the median (self, cumulative) import time of ``module`` in microseconds."""
+    own, samples = [], []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            self_us, cumulative, name = line[len("import time:") :].split("|")
+            if name.strip() == module:
+                own.append(int(self_us))
+                samples.append(int(cumulative))
+                break
+    return statistics.median(own), statistics.median(samples)
+
+
+def startup_ms(mode, port, repeat):
+    """Return the median time from spawning the server to it listening, in milliseconds."""
+    samples = []
+    for attempt in range(repeat):
+        start = time.perf_counter()
+        proc = start_server(mode, port + attempt)
+        samples.append((time.perf_counter() - start) * 1000)
+        proc.terminate()
+        proc.wait()
+    return round(statistics.median(samples), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modules", default="game_config,protocol,snapshot,network,server")
+    parser.add_argument("--modes", default="threaded,asyncio")
+    parser.add_argument("--port", type=int, default=5700)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print results as JSON lines")
+    args = parser.parse_args()
+
+    # keep address resolution out of the measurement, as in a configured deployment
+    os.environ.setdefault("COIN_BASE_SERVER", "127.0.0.1")
+
+    if not args.json:
+        print(f"{'import':<14}{'self us':>10}{'cumul. us':>12}")
+    for module in args.modules.split(","):
+        self_us, cumulative_us = import_time_us(module, args.repeat)
+        if args.json:
+            print(json.dumps({"import": module, "self_us": self_us, "cumulative_us": cumulative_us}))
+        else:
+            print(f"{module:<14}{self_us:>10}{cumulative_us:>12}")
+
+    if not args.json:
+        print(f"\n{'server mode':<14}{'ms':>10}")
+    for index, mode in enumerate(args.modes.split(",")):
+        ms = startup_ms(mode, args.port + index * args.repeat, args.repeat)
+        if args.json:
+            print(json.dumps({"mode": mode, "startup_ms": ms}))
+        else:
+            print(f"{mode:<14}{ms:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Headless bot swarm: load-test a server with simulated clients.
+
+Each bot is a ``Network`` in background mode that moves its predicted
+``Player`` with a movement pattern at a fixed send rate; bots are spread over
+worker processes. For every player count the swarm reports throughput,
+input round-trip latency (post to the first snapshot that applied it) and
+bytes per client, and after the ramp the largest count that stayed within
+``--max-p99-ms`` while every bot kept up its send rate.
+
+Without ``--server`` a local ``server.py`` is started per count in ``--mode``,
+as a lobby over ``--workers`` processes if given. Bots follow the lobby's
+redirect to their room like any client.
+
+Usage:
+    python -m benchmarks.swarm --mode asyncio --counts 25,50,100 --pattern random
+    python -m benchmarks.swarm --mode asyncio --workers 4 --counts 100,200,400
+    python -m benchmarks.swarm --server 127.0.0.1 --port 6000 --udp --counts 10
+    python -m benchmarks.swarm --server 10.0.0.5 --counts 100,200 --rate 30 --json
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import random
+import time
+from collections import deque
+
+from benchmarks.connections import server_stats, start_server
+from game_config import PLAYER_LIMIT_LEFT, PLAYER_LIMIT_RIGHT, PORT, ROOMS_PER_WORKER, TICK_RATE
+from network import Network
+from player_state import KEY_DOWN, KEY_LEFT, KEY_RIGHT, KEY_UP
+
+
+class Bot(Network):
+    """A Network that records the round-trip time of every input it posts."""
+
+    def __init__(self, server, port, udp=False):
+        self.sent = deque()
+        self.latencies = []
+        self.snapshots_received = 0
+        self.keys = 0
+        super().__init__(server, port, track_opponents=False, udp=udp)
+
+    def post_input(self, keys):
+        self.sent.append((self.input_seq + 1, time.perf_counter()))
+        super().post_input(keys)
+
+    def apply_snapshot(self, payload):
+        multiplier = super().apply_snapshot(payload)
+        if multiplier is None:
+            # stale, or dropped for lack of its base: nothing was applied
+            return None
+        now = time.perf_counter()
+        self.snapshots_received += 1
+        while self.sent and self.sent[0][0] <= self.applied_input_seq:
+            self.latencies.append(now - self.sent.popleft()[1])
+        return multiplier
+
+
+def idle(bot, response, rng):
+    return 0
+
+
+def wander(bot, response, rng):
+    """Hold a random direction, changing it about twice a second."""
+    if rng.random() < 0.05:
+        bot.keys = rng.choice([0, KEY_LEFT, KEY_RIGHT]) | rng.choice([0, KEY_UP, KEY_DOWN])
+    return bot.keys
+
+
+def sweep(bot, response, rng):
+    """Run left and right across the play area."""
+    player = bot.player
+    if player.x <= PLAYER_LIMIT_LEFT + 10:
+        bot.keys = KEY_RIGHT
+    elif player.x >= PLAYER_LIMIT_RIGHT - player.width - 10 or not bot.keys:
+        bot.keys = KEY_LEFT
+    return bot.keys
+
+
+def chase(bot, response, rng):
+    """Head for the nearest coin."""
+    coins = response["coins"]
+    if not coins:
+        return 0
+    player = bot.player
+    x, y = player.x + player.width / 2, player.y + player.height / 2
+    (coin_x, coin_y), _ = min(coins.values(), key=lambda c: (c[0][0] - x) ** 2 + (c[0][1] - y) ** 2)
+    keys = 0
+    if coin_x < x - player.vel:
+        keys |= KEY_LEFT
+    elif coin_x > x + player.vel:
+        keys |= KEY_RIGHT
+    if coin_y < y - player.vel:
+        keys |= KEY_UP
+    elif coin_y > y + player.vel:
+        keys |= KEY_DOWN
+    return keys
+
+
+PATTERNS = {"idle": idle, "random": wander, "sweep": sweep, "coins": chase}
+
+
+def counters(bots):
+    return [
+        (
+            len(bot.latencies),
+            bot.bytes_sent,
+            bot.reader.received + bot.datagram_received,
+            bot.snapshots_received,
+            bot.input_seq,
+        )
+        for bot in bots
+    ]
+
+
+def run_bots(server, port, count, pattern, rate, warmup, duration, seed, udp, results):
+    """Worker process: drive ``count`` bots and put their measurements on ``results``."""
+    rng = random.Random(seed)
+    move = PATTERNS[pattern]
+    bots = [Bot(server, port, udp) for _ in range(count)]
+    connected = [bot for bot in bots if bot.player is not None]
+    for bot in connected:
+        bot.start()
+
+    interval = 1 / rate
+    start = next_send = time.perf_counter()
+    measure_from = start + warmup
+    stop = measure_from + duration
+    base = None
+    ticks = late = 0
+    while True:
+        now = time.perf_counter()
+        if base is None and now >= measure_from:
+            base = counters(connected)
+        if now >= stop:
+            break
+        for bot in connected:
+            if bot.running:
+                bot.post_input(move(bot, bot.poll(), rng))
+        next_send += interval
+        delay = next_send - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        elif base is not None:
+            late += 1
+        if base is not None:
+            ticks += 1
+
+    end = counters(connected)
+    dropped = sum(not bot.running for bot in connected)
+    for bot in connected:
+        bot.disconnect()
+    base = base or end
+    results.put(
+        {
+            "failed": count - len(connected) + dropped,
+            "latencies": [
+                latency
+                for bot, (first, *_), (last, *_) in zip(connected, base, end)
+                for latency in bot.latencies[first:last]
+            ],
+            "bytes_out": sum(e[1] - b[1] for b, e in zip(base, end)),
+            "bytes_in": sum(e[2] - b[2] for b, e in zip(base, end)),
+            "snapshots": sum(e[3] - b[3] for b, e in zip(base, end)),
+            "inputs": sum(e[4] - b[4] for b, e in zip(base, end)),
+            "ticks": ticks,
+            "late": late,
+        }
+    )
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else None
+
+
+def run_swarm(args, count, port):
+    """Run one step of the ramp and return its summary."""
+    proc = None
+    server = args.server
+    if server is None:
+        server = "127.0.0.1"
+        extra_args = ["--udp"] if args.udp else []
+        if args.workers:
+            extra_args += ["--workers", str(args.workers), "--rooms-per-worker", str(args.rooms_per_worker)]
+        proc = start_server(args.mode, port, extra_args)
+    try:
+        processes = args.processes or max(1, math.ceil(count / args.bots_per_process))
+        results = multiprocessing.Queue()
+        workers = []
+        for index in range(processes):
+            share = count // processes + (index < count % processes)
+            worker = multiprocessing.Process(
+                target=run_bots,
+                args=(
+                    server,
+                    port,
+                    share,
+                    args.pattern,
+                    args.rate,
+                    args.warmup,
+                    args.duration,
+                    args.seed + index,
+                    args.udp,
+                    results,
+                ),
+            )
+            worker.start()
+            workers.append(worker)
+        # sample the server halfway through the measured window
+        time.sleep(args.warmup + args.duration / 2)
+        threads, rss_kb = server_stats(proc.pid) if proc else (None, None)
+        outcomes = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+    finally:
+        if proc is not None:
+            proc.kill()
+            proc.wait()
+
+    latencies = sorted(l for outcome in outcomes for l in outcome["latencies"])
+    failed = sum(outcome["failed"] for outcome in outcomes)
+    inputs = sum(outcome["inputs"] for outcome in outcomes)
+    ticks = sum(outcome["ticks"] for outcome in outcomes)
+    late = sum(outcome["late"] for outcome in outcomes)
+    clients = max(1, count - failed)
+    send_rate = inputs / clients / args.duration
+    result = {
+        "mode": args.mode if args.server is None else "remote",
+        "workers": args.workers,
+        "udp": args.udp,
+        "players": count,
+        "failed": failed,
+        "pattern": args.pattern,
+        "target_rate": args.rate,
+        "send_rate": round(send_rate, 1),
+        "inputs_per_s": round(inputs / args.duration, 1),
+        "snapshots_per_s": round(sum(o["snapshots"] for o in outcomes) / args.duration, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        "bytes_in_per_client_s": round(sum(o["bytes_in"] for o in outcomes) / clients / args.duration),
+        "bytes_out_per_client_s": round(sum(o["bytes_out"] for o in outcomes) / clients / args.duration),
+        "generator_late": round(late / ticks, 3) if ticks else None,
+        "server_threads": threads,
+        "server_rss_kb": rss_kb,
+    }
+    result["sustained"] = bool(
+        latencies
+        and not failed
+        and result["p99_ms"] <= args.max_p99_ms
+        and send_rate >= 0.9 * args.rate
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--server", help="address of a running server (default: start one locally)")
+    parser.add_argument("--port", type=int, default=None, help=f"server port (default: {PORT} with --server)")
+    parser.add_argument("--mode", choices=("threaded", "asyncio"), default="asyncio")
+    parser.add_argument(
+        "--workers", type=int, default=0, help="start the local server as a lobby with worker processes"
+    )
+    parser.add_argument("--rooms-per-worker", type=int, default=ROOMS_PER_WORKER)
+    parser.add_argument(
+        "--udp", action="store_true", help="bots accept UDP (and a local server offers it; asyncio only)"
+    )
+    parser.add_argument("--counts", default="10,25,50,100")
+    parser.add_argument("--pattern", choices=sorted(PATTERNS), default="random")
+    parser.add_argument("--rate", type=float, default=TICK_RATE, help="inputs per second per bot")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per count")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds per count")
+    parser.add_argument("--processes", type=int, default=0, help="worker processes (default: by count)")
+    parser.add_argument("--bots-per-process", type=int, default=100)
+    parser.add_argument("--max-p99-ms", type=float, default=100.0, help="latency budget for --counts")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print results as JSON lines")
+    args = parser.parse_args()
+
+    port = args.port or (PORT if args.server else 5800)
+    if not args.json:
+        print(
+            f"{'mode':<10}{'players':>8}{'failed':>7}{'send/s':>8}{'snaps/s':>9}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'in B/s':>9}{'out B/s':>9}{'late':>7}{'ok':>4}"
+        )
+    sustained = 0
+    for count in (int(c) for c in args.counts.split(",")):
+        result = run_swarm(args, count, port)
+        if args.server is None:
+            # the lobby's rooms listen on the ports after it
+            port += 1 + args.workers * args.rooms_per_worker
+        if result["sustained"]:
+            sustained = max(sustained, count)
+        if args.json:
+            print(json.dumps(result), flush=True)
+            continue
+        print(
+            f"{result['mode']:<10}{count:>8}{result['failed']:>7}{result['send_rate']:>8}"
+            f"{result['snapshots_per_s']:>9}{result['p50_ms']!s:>9}{result['p95_ms']!s:>9}"
+            f"{result['p99_ms']!s:>9}{result['bytes_in_per_client_s']:>9}"
+            f"{result['bytes_out_per_client_s']:>9}{result['generator_late']!s:>7}"
+            f"{'yes' if result['sustained'] else 'no':>4}",
+            flush=True,
+        )
+    summary = {"max_sustainable_players": sustained, "max_p99_ms": args.max_p99_ms}
+    print(json.dumps(summary) if args.json else f"max sustainable players: {sustained}")
+
+
+if __name__ == "__main__":
+    main()
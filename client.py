@@ -1,221 +1,318 @@
-import time
-import pygame
-from network import Network
-from game_config import (
-    SCREEN_WIDTH,
-    SCREEN_HEIGHT,
-    FPS,
-    SCREEN_COLOR,
-    ACCENT_PINK,
-    ACCENT_YELLOW,
-    HEADER_HEIGHT,
-    FOOTER_HEIGHT,
-    SCORECARD_HEIGHT,
-    SCORECARD_WIDTH,
-)
-from draw import (
-    draw_rect_with_text,
-    draw_coin,
-    draw_character,
-)
-
-
-DRAW_GUI = True
-BORDER_WIDTH = 1
-
-footer_credits = ["VISHAL", "", "KASHYAP"]
-
-
-def draw_background(win):
-
-    win.fill(SCREEN_COLOR)
-
-    # header
-    draw_rect_with_text(
-        text="COIN - BASE",
-        font="MabryPro-Regular",
-        font_size=48,
-        rect_position=(0, 0),
-        rect_width=SCREEN_WIDTH,
-        rect_height=HEADER_HEIGHT,
-        color=SCREEN_COLOR,
-        win=win,
-        border_width=BORDER_WIDTH,
-        h_align="center",
-    )
-
-    # SCORECARD
-    draw_rect_with_text(
-        rect_position=(0, 0),
-        rect_width=SCORECARD_WIDTH,
-        rect_height=SCREEN_HEIGHT,
-        color=SCREEN_COLOR,
-        win=win,
-        border_width=BORDER_WIDTH,
-    )
-
-    draw_rect_with_text(
-        text="scoreboard",
-        font_size=18,
-        rect_position=(0, 0),
-        rect_width=SCORECARD_WIDTH,
-        rect_height=HEADER_HEIGHT,
-        color=SCREEN_COLOR,
-        win=win,
-        border_width=BORDER_WIDTH,
-        padding_x=16,
-    )
-
-    # footer
-    for i, credit in enumerate(footer_credits):
-        draw_rect_with_text(
-            text=credit,
-            font_size=14,
-            rect_position=(
-                i * (SCREEN_WIDTH / len(footer_credits)),
-                SCREEN_HEIGHT - FOOTER_HEIGHT,
-            ),
-            rect_width=SCREEN_WIDTH / len(footer_credits),
-            rect_height=FOOTER_HEIGHT,
-            color=ACCENT_PINK if i % 2 == 0 else ACCENT_YELLOW,
-            win=win,
-            border_width=BORDER_WIDTH,
-            h_align="center",
-        )
-
-
-def draw_scoreboard(player, opponents, win):
-    draw_rect_with_text(
-        rect_position=(0, HEADER_HEIGHT + BORDER_WIDTH),
-        rect_width=SCORECARD_WIDTH,
-        rect_height=SCREEN_HEIGHT - HEADER_HEIGHT - FOOTER_HEIGHT - 2 * BORDER_WIDTH,
-        color=SCREEN_COLOR,
-        win=win,
-    )
-    # Combine player and opponents' scores and sort them by score
-    all_scores = [(player.name, player.score)] + [
-        (opp.name, opp.score) for opp in opponents.values()
-    ]
-    all_scores.sort(key=lambda x: x[1], reverse=True)
-
-    # Draw scoreboard items for each player and opponent
-    for i, (name, score) in enumerate(all_scores):
-
-        draw_rect_with_text(
-            text=name + "           " + str(round(score, 2)),
-            font_size=14,
-            rect_position=(
-                0,
-                HEADER_HEIGHT + BORDER_WIDTH + i * SCORECARD_HEIGHT,
-            ),
-            rect_width=SCORECARD_WIDTH,
-            rect_height=SCORECARD_HEIGHT,
-            color=ACCENT_YELLOW if name == player.name else ACCENT_PINK,
-            win=win,
-            border_width=BORDER_WIDTH,
-            padding_x=18,
-        )
-
-
-def redraw_window(player, opponents, coins, win):
-    """
-    Redraw the window with a white background and the players.
-
-    Args:
-        win (pygame.Surface): The window surface to draw on.
-        player (Player): The player object to draw.
-        opponents (dict): Dictionary containing opponent players.
-        coins (list): List containing coin tuples (position, multiplier).
-    """
-
-    draw_rect_with_text(
-        rect_position=(SCORECARD_WIDTH + BORDER_WIDTH, HEADER_HEIGHT + BORDER_WIDTH),
-        rect_width=SCREEN_WIDTH - SCORECARD_WIDTH - 2 * BORDER_WIDTH,
-        rect_height=SCREEN_HEIGHT - HEADER_HEIGHT - FOOTER_HEIGHT - 2 * BORDER_WIDTH,
-        color=SCREEN_COLOR,
-        win=win,
-    )
-    draw_scoreboard(player, opponents, win)
-    for coin in coins:
-        draw_coin(coin, win)
-    for opp_id, opp in opponents.items():
-        draw_character(opp, win)
-
-    draw_character(player, win)
-
-    pygame.display.update()
-
-
-def handle_events():
-    """Handle events such as quitting the game."""
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            return False
-    return True
-
-
-def main():
-    """Main function to run the game."""
-    running = True
-    n = Network()
-    player = n.getPlayer()
-    print(player.get_player_details())
-    print(player.name)
-    clock = pygame.time.Clock()
-    while running:
-        clock.tick(FPS)
-
-        response = n.send(player)
-        multiplier = response.get("multiplier", 0)
-        if multiplier != 0:
-            player.update_score(multiplier)
-        opponents = response["opponents"]
-        winner = response["winner"]
-        # print("hi", winner)
-        if winner:
-            coins = {}
-            break
-
-        else:
-            coins = response["coins"]
-        running = handle_events()
-        if not running:
-            print("Disconnected")
-            n.disconnect()
-
-        player.move()
-        redraw_window(player, opponents, coins, win)
-
-    # Draw the rectangle and winner text
-
-    if winner:
-
-        draw_rect_with_text(
-            text="Player " + winner + " WON!!!",
-            font_size=18,
-            rect_position=(
-                SCORECARD_WIDTH + BORDER_WIDTH,
-                HEADER_HEIGHT + BORDER_WIDTH,
-            ),
-            rect_width=SCREEN_WIDTH - SCORECARD_WIDTH - 2 * BORDER_WIDTH,
-            rect_height=SCREEN_HEIGHT
-            - HEADER_HEIGHT
-            - FOOTER_HEIGHT
-            - 2 * BORDER_WIDTH,
-            color=ACCENT_YELLOW if winner == player.name else ACCENT_PINK,
-            win=win,
-            border_width=BORDER_WIDTH,
-            h_align="center",
-        )
-        pygame.display.update()
-        time.sleep(5)
-
-    pygame.quit()
-
-
-if __name__ == "__main__":
-    pygame.init()
-    win = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    pygame.display.set_caption("Client")
-    draw_background(win)  # optimise this shit
-    main()
+import argparse
+import time
+from functools import partial
+import pygame
+from network import Network
+from player import read_keys
+from game_config import (
+    SCREEN_WIDTH,
+    SCREEN_HEIGHT,
+    FPS,
+    PORT,
+    ACCENT_PINK,
+    ACCENT_YELLOW,
+    HEADER_HEIGHT,
+    FOOTER_HEIGHT,
+    SCORECARD_HEIGHT,
+    SCORECARD_WIDTH,
+    DEFAULT_THEME,
+)
+from draw import (
+    load_sprites,
+    draw_rect_with_text,
+    draw_coin,
+    draw_character,
+    coin_rect,
+    character_rect,
+)
+from renderer import DirtyRenderer, LayerCache
+from scoreboard import Scoreboard
+
+
+DRAW_GUI = True
+BORDER_WIDTH = 1
+
+footer_credits = ["VISHAL", "", "KASHYAP"]
+
+PLAY_AREA = pygame.Rect(
+    SCORECARD_WIDTH + BORDER_WIDTH,
+    HEADER_HEIGHT + BORDER_WIDTH,
+    SCREEN_WIDTH - SCORECARD_WIDTH - 2 * BORDER_WIDTH,
+    SCREEN_HEIGHT - HEADER_HEIGHT - FOOTER_HEIGHT - 2 * BORDER_WIDTH,
+)
+
+
+def draw_background(win, theme=DEFAULT_THEME):
+    """
+    Draw the static chrome: header, scorecard frame, footer and play-area fill.
+
+    Args:
+        win (pygame.Surface): The surface to draw on, usually a cached layer.
+        theme (Theme): The colors to draw with.
+    """
+    win.fill(theme.background)
+
+    # header
+    draw_rect_with_text(
+        text="COIN - BASE",
+        font="MabryPro-Regular",
+        font_size=48,
+        rect_position=(0, 0),
+        rect_width=SCREEN_WIDTH,
+        rect_height=HEADER_HEIGHT,
+        color=theme.background,
+        win=win,
+        border_width=BORDER_WIDTH,
+        h_align="center",
+    )
+
+    # SCORECARD
+    draw_rect_with_text(
+        rect_position=(0, 0),
+        rect_width=SCORECARD_WIDTH,
+        rect_height=SCREEN_HEIGHT,
+        color=theme.background,
+        win=win,
+        border_width=BORDER_WIDTH,
+    )
+
+    draw_rect_with_text(
+        text="scoreboard",
+        font_size=18,
+        rect_position=(0, 0),
+        rect_width=SCORECARD_WIDTH,
+        rect_height=HEADER_HEIGHT,
+        color=theme.background,
+        win=win,
+        border_width=BORDER_WIDTH,
+        padding_x=16,
+    )
+
+    # footer
+    for i, credit in enumerate(footer_credits):
+        draw_rect_with_text(
+            text=credit,
+            font_size=14,
+            rect_position=(
+                i * (SCREEN_WIDTH / len(footer_credits)),
+                SCREEN_HEIGHT - FOOTER_HEIGHT,
+            ),
+            rect_width=SCREEN_WIDTH / len(footer_credits),
+            rect_height=FOOTER_HEIGHT,
+            color=theme.primary if i % 2 == 0 else theme.secondary,
+            win=win,
+            border_width=BORDER_WIDTH,
+            h_align="center",
+        )
+
+
+def score_row_rect(slot):
+    """
+    Return the region of a scoreboard row.
+
+    Neighbouring rows share one border line, so a row can be redrawn on its
+    own without disturbing the rows around it.
+    """
+    top = HEADER_HEIGHT + BORDER_WIDTH + slot * SCORECARD_HEIGHT
+    return pygame.Rect(
+        0, top - BORDER_WIDTH, SCORECARD_WIDTH + BORDER_WIDTH, SCORECARD_HEIGHT + BORDER_WIDTH
+    )
+
+
+def draw_score_row(slot, row, highlight, win, theme=DEFAULT_THEME):
+    """
+    Draw one scoreboard row.
+
+    Args:
+        slot (int): The row's position on the board, from 0.
+        row (tuple): (rank, player id, name, score).
+        highlight (bool): Whether this is the local player's row.
+        win (pygame.Surface): The window surface to draw on.
+        theme (Theme): The colors to draw with.
+    """
+    rank, _, name, score = row
+    draw_rect_with_text(
+        text=str(rank) + ". " + name + "      " + str(round(score, 2)),
+        font_size=14,
+        rect_position=(0, HEADER_HEIGHT + BORDER_WIDTH + slot * SCORECARD_HEIGHT),
+        rect_width=SCORECARD_WIDTH,
+        rect_height=SCORECARD_HEIGHT - BORDER_WIDTH,
+        color=theme.secondary if highlight else theme.primary,
+        win=win,
+        border_width=BORDER_WIDTH,
+        padding_x=12,
+    )
+
+
+def draw_scoreboard(player, opponents, scoreboard, renderer, theme=DEFAULT_THEME):
+    """
+    Update the scoreboard, redrawing only the rows whose content changed.
+
+    Args:
+        player (Player): The local player, pinned to the board.
+        opponents (dict): Dictionary containing opponent players.
+        scoreboard (Scoreboard): The rankings kept between frames.
+        renderer (DirtyRenderer): Redraws rows as panels over the background.
+        theme (Theme): The colors to draw with.
+
+    Returns:
+        list: The pygame.Rect regions that were redrawn.
+    """
+    scores = {opp_id: (opp.name, opp.score) for opp_id, opp in opponents.items()}
+    scores[player.id] = (player.name, player.score)
+    scoreboard.update(scores)
+    rows = scoreboard.rows(player.id)
+
+    dirty = []
+    for slot in range(scoreboard.size):
+        rect = score_row_rect(slot)
+        if slot < len(rows):
+            highlight = rows[slot][1] == player.id
+            look = (rows[slot], highlight)
+            draw = partial(draw_score_row, slot, rows[slot], highlight, theme=theme)
+        else:
+            # keep the border line shared with the row above
+            rect = pygame.Rect(rect.x, rect.y + BORDER_WIDTH, rect.width, rect.height - BORDER_WIDTH)
+            look = None
+            draw = lambda win: None
+        dirty += renderer.render_panel(("score", slot), rect, look, draw)
+    return dirty
+
+
+def redraw_window(player, opponents, coins, renderer, layers, scoreboard, theme=DEFAULT_THEME):
+    """
+    Redraw the parts of the window that changed since the last frame.
+
+    The static chrome comes from a cached layer that is only drawn again when
+    the window size or theme changes; the scoreboard and play area are
+    composited on top of it.
+
+    Args:
+        player (Player): The player object to draw.
+        opponents (dict): Dictionary containing opponent players.
+        coins (dict): Mapping of coin id to (position, multiplier).
+        renderer (DirtyRenderer): Tracks what is on screen in the play area.
+        layers (LayerCache): Holds the pre-rendered background layer.
+        scoreboard (Scoreboard): The rankings kept between frames.
+        theme (Theme): The colors to draw the chrome with.
+    """
+    renderer.set_background(
+        layers.get("background", renderer.win.get_size(), theme, draw_background)
+    )
+    items = {}
+    for coin_id, coin in coins.items():
+        items[coin_id] = (coin_rect(coin), None, partial(draw_coin, coin))
+    for opp_id, opp in opponents.items():
+        items[opp_id] = (
+            character_rect(opp),
+            (opp.color, opp.direction),
+            partial(draw_character, opp),
+        )
+    items[player.id] = (
+        character_rect(player),
+        (player.color, player.direction),
+        partial(draw_character, player),
+    )
+
+    dirty = renderer.render(items)
+    dirty += draw_scoreboard(player, opponents, scoreboard, renderer, theme)
+    if dirty:
+        pygame.display.update(dirty)
+
+
+def handle_events(renderer):
+    """Handle events such as quitting the game."""
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            return False
+        if event.type in (pygame.VIDEORESIZE, pygame.VIDEOEXPOSE):
+            renderer.invalidate()
+    return True
+
+
+def main(server=None, port=PORT, udp=False):
+    """
+    Main function to run the game.
+
+    Args:
+        server (str, optional): The server address; resolved lazily if omitted.
+        port (int): The server port.
+        udp (bool): Accept the server's offer of UDP for inputs and snapshots.
+    """
+    running = True
+    n = Network(server, port, udp=udp)
+    player = n.getPlayer()
+    print(player.get_player_details())
+    print(player.name)
+    n.start()
+    layers = LayerCache()
+    background = layers.get("background", win.get_size(), DEFAULT_THEME, draw_background)
+    renderer = DirtyRenderer(win, PLAY_AREA, background)
+    scoreboard = Scoreboard()
+    clock = pygame.time.Clock()
+    while running:
+        clock.tick(FPS)
+
+        n.post_input(read_keys())
+        response = n.poll()
+        opponents = response["opponents"]
+        winner = response["winner"]
+        # print("hi", winner)
+        if winner:
+            coins = {}
+            break
+
+        else:
+            coins = response["coins"]
+        running = handle_events(renderer)
+        if not running:
+            print("Disconnected")
+            n.disconnect()
+
+        redraw_window(player, opponents, coins, renderer, layers, scoreboard)
+
+    # Draw the rectangle and winner text
+
+    if winner:
+
+        draw_rect_with_text(
+            text="Player " + winner + " WON!!!",
+            font_size=18,
+            rect_position=(
+                SCORECARD_WIDTH + BORDER_WIDTH,
+                HEADER_HEIGHT + BORDER_WIDTH,
+            ),
+            rect_width=SCREEN_WIDTH - SCORECARD_WIDTH - 2 * BORDER_WIDTH,
+            rect_height=SCREEN_HEIGHT
+            - HEADER_HEIGHT
+            - FOOTER_HEIGHT
+            - 2 * BORDER_WIDTH,
+            color=ACCENT_YELLOW if winner == player.name else ACCENT_PINK,
+            win=win,
+            border_width=BORDER_WIDTH,
+            h_align="center",
+        )
+        pygame.display.update()
+        time.sleep(5)
+
+    pygame.quit()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Coin-Base game client.")
+    parser.add_argument(
+        "--server",
+        help="server address (default: $COIN_BASE_SERVER, else the cached or detected LAN address)",
+    )
+    parser.add_argument("--port", type=int, default=PORT, help="server port")
+    parser.add_argument("--udp", action="store_true", help="use UDP for game state if the server offers it")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    pygame.init()
+    win = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Client")
+    load_sprites()
+    main(args.server, args.port, args.udp)
@@ -0,0 +1,163 @@
+from array import array
+from collision import np
+from game_config import MAX_COINS
+
+
+class CoinPool:
+    """
+    The coins in play, stored column-wise in preallocated slots.
+
+    x, y, multiplier and alive are parallel columns, numpy arrays when numpy
+    is installed. x and y are the two columns of ``centers`` and a free
+    slot's multiplier is NaN, so the vectorized pickup pass can run over
+    every slot as it is, without gathering the live coins first: a NaN
+    radius never touches anything, and the indices it returns are slots.
+    Freed slots go on a free list and are reused, so spawning and removing
+    a coin is O(1) and allocates nothing until more than ``capacity`` coins
+    are alive at once.
+
+    A coin's id is its slot plus the slot's generation, which is bumped each
+    time the slot is reused: ids stay unique for clients diffing coins by id,
+    and the slot is recovered from an id with a mask. ``alive`` says which
+    slots hold a coin; an id is in play if its slot is alive and its
+    generation is the slot's current one.
+
+    Reads like a mapping of coin id to ((x, y), multiplier).
+    """
+
+    SLOT_BITS = 16
+    SLOT_MASK = (1 << SLOT_BITS) - 1
+    # every slot must fit in SLOT_BITS, or ids would collide
+    MAX_CAPACITY = SLOT_MASK + 1
+    # ids are sent as uint32
+    GENERATION_MASK = (1 << (32 - SLOT_BITS)) - 1
+
+    def __init__(self, capacity=MAX_COINS):
+        """
+        Initialize an empty pool.
+
+        Args:
+            capacity (int): The slots to preallocate; the pool doubles when
+                full, up to MAX_CAPACITY.
+        """
+        if capacity > self.MAX_CAPACITY:
+            raise ValueError(f"CoinPool capacity {capacity} exceeds {self.MAX_CAPACITY}")
+        self.capacity = 0
+        self.count = 0
+        self.free = []
+        self.generations = array("L")
+        if np is not None:
+            self.centers = np.zeros((0, 2), dtype=float)
+            self.multiplier = np.zeros(0, dtype=float)
+            self.alive = np.zeros(0, dtype=bool)
+        else:
+            self.x = array("d")
+            self.y = array("d")
+            self.multiplier = array("d")
+            self.alive = array("b")
+        self.grow(max(1, capacity))
+
+    def grow(self, capacity):
+        """Extend every column to ``capacity`` slots, adding the new ones to the free list."""
+        added = capacity - self.capacity
+        if np is not None:
+            self.centers = np.concatenate((self.centers, np.zeros((added, 2), dtype=float)))
+            self.x = self.centers[:, 0]
+            self.y = self.centers[:, 1]
+            self.multiplier = np.concatenate((self.multiplier, np.full(added, np.nan)))
+            self.alive = np.concatenate((self.alive, np.zeros(added, dtype=bool)))
+        else:
+            self.x.extend([0.0] * added)
+            self.y.extend([0.0] * added)
+            self.multiplier.extend([float("nan")] * added)
+            self.alive.extend([0] * added)
+        self.generations.extend([0] * added)
+        # popped from the end, so the lowest slots are used first
+        self.free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def add(self, center, multiplier):
+        """
+        Put a coin in a free slot.
+
+        Args:
+            center (tuple): The coin's center (x, y).
+            multiplier (float): The coin's multiplier.
+
+        Returns:
+            int: The coin's id.
+
+        Raises:
+            IndexError: If MAX_CAPACITY coins are already in play.
+        """
+        if not self.free:
+            if self.capacity == self.MAX_CAPACITY:
+                raise IndexError(f"CoinPool is full at {self.MAX_CAPACITY} coins")
+            self.grow(min(self.capacity * 2, self.MAX_CAPACITY))
+        slot = self.free.pop()
+        generation = self.generations[slot] = (self.generations[slot] + 1) & self.GENERATION_MASK
+        self.x[slot], self.y[slot] = center
+        self.multiplier[slot] = multiplier
+        self.alive[slot] = True
+        self.count += 1
+        return (generation << self.SLOT_BITS) | slot
+
+    def coin_id(self, slot):
+        """Return the id of the coin in a live slot."""
+        return (self.generations[slot] << self.SLOT_BITS) | slot
+
+    def slot(self, coin_id):
+        """Return the slot of a live coin, or None if ``coin_id`` is not in play."""
+        slot = coin_id & self.SLOT_MASK
+        if (
+            slot < self.capacity
+            and self.alive[slot]
+            and self.generations[slot] == coin_id >> self.SLOT_BITS
+        ):
+            return slot
+        return None
+
+    def live_slots(self):
+        """Return the slots holding a coin, in slot order."""
+        if np is not None:
+            return np.flatnonzero(self.alive).tolist()
+        return [slot for slot, alive in enumerate(self.alive) if alive]
+
+    def remove(self, coin_id):
+        """Remove a coin and free its slot. Raises KeyError if it is not in play."""
+        slot = self.slot(coin_id)
+        if slot is None:
+            raise KeyError(coin_id)
+        self.alive[slot] = False
+        self.multiplier[slot] = float("nan")
+        self.free.append(slot)
+        self.count -= 1
+
+    def clear(self):
+        """Remove every coin; generations carry on, so old ids are not reissued soon."""
+        for coin_id in self.keys():
+            self.remove(coin_id)
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, coin_id):
+        return self.slot(coin_id) is not None
+
+    def __getitem__(self, coin_id):
+        slot = self.slot(coin_id)
+        if slot is None:
+            raise KeyError(coin_id)
+        return (int(self.x[slot]), int(self.y[slot])), float(self.multiplier[slot])
+
+    def keys(self):
+        return [self.coin_id(slot) for slot in self.live_slots()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def values(self):
+        return [self[coin_id] for coin_id in self.keys()]
+
+    def items(self):
+        return [(coin_id, self[coin_id]) for coin_id in self.keys()]
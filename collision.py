@@ -0,0 +1,39 @@
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; the server falls back to CoinGrid
+    np = None
+
+
+def resolve_pickups(player_centers, player_radii, coin_centers, coin_radii):
+    """
+    Work out which player picks up which coin in one broadcasted pass.
+
+    A player touches a coin when the distance between their centers is at
+    most the sum of their radii. A coin touched by several players goes to the
+    closest one; exact ties go to the player with the lowest index, so callers
+    get a deterministic result by passing players in a stable order.
+
+    Args:
+        player_centers (numpy.ndarray): (P, 2) array of player centers.
+        player_radii (numpy.ndarray): (P,) array of player radii.
+        coin_centers (numpy.ndarray): (C, 2) array of coin centers.
+        coin_radii (numpy.ndarray): (C,) array of coin radii.
+
+    Returns:
+        tuple: (coin indices, player indices) of every pickup, as int arrays.
+    """
+    # (P, C) squared distances and squared reaches, computed in place
+    dx = player_centers[:, 0, None] - coin_centers[None, :, 0]
+    dy = player_centers[:, 1, None] - coin_centers[None, :, 1]
+    distance_squared = dx * dx
+    distance_squared += dy * dy
+    reach = player_radii[:, None] + coin_radii[None, :]
+    reach *= reach
+    touching = distance_squared <= reach
+
+    grabbed = np.flatnonzero(touching.any(axis=0))
+    if not grabbed.size:
+        return grabbed, grabbed
+    # argmin returns the first minimum, which breaks ties by player index
+    candidates = np.where(touching[:, grabbed], distance_squared[:, grabbed], np.inf)
+    return grabbed, candidates.argmin(axis=0)
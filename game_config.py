@@ -1,91 +1,194 @@
-import random
-import socket
-import subprocess
-import re
-
-
-WINNING_POINTS = 20
-
-# Screen Constants
-FPS = 60
-SCREEN_WIDTH = 1000
-SCREEN_HEIGHT = 800
-HEADER_HEIGHT = 54
-FOOTER_HEIGHT = 38
-SCORECARD_HEIGHT = 28
-SCORECARD_WIDTH = SCREEN_WIDTH // 6
-SCREEN_COLOR = (253, 252, 238)
-
-ACCENT_PINK = (255, 144, 232)
-ACCENT_YELLOW = (255, 201, 0)
-
-# Player Constants
-PLAYER_WIDTH = 64
-PLAYER_HEIGHT = 64
-CHARACTER_COLORS = ["blue", "green", "pink", "purple", "red", "yellow"]
-PLAYER_LIMIT_LEFT = SCORECARD_WIDTH
-PLAYER_LIMIT_RIGHT = SCREEN_WIDTH
-PLAYER_LIMIT_TOP = HEADER_HEIGHT
-PLAYER_LIMIT_DOWN = SCREEN_HEIGHT - FOOTER_HEIGHT
-
-# Coin Constants
-COIN_RADIUS = 16
-COIN_COLOR = (255, 215, 0)
-MAX_COINS = 5
-MIN_GENERATE_INTERVAL = 1
-MAX_GENERATE_INTERVAL = 5
-
-# Networking Constants
-PORT = 5555
-BUFFER_SIZE = 2048
-
-def get_coin_multiplier() -> float:
-    """Generate random coin multiplier between 1.0 and 1.7."""
-    return 1.0 + random.random() * 0.7
-
-def generate_coin() -> tuple:
-    """Generate a random coin position and multiplier."""
-    coin_pos = get_random_pos(20)
-    multiplier = get_coin_multiplier()
-    return coin_pos, multiplier
-
-def get_random_color() -> tuple:
-    """Generate random RGB color."""
-    return (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
-
-def get_random_character() -> str:
-    """Choose random character color."""
-    return random.choice(CHARACTER_COLORS)
-
-def get_random_pos(gutter: int = 50) -> tuple:
-    """Generate random position within screen bounds."""
-    return (
-        random.randint(SCORECARD_WIDTH + gutter, SCREEN_WIDTH - gutter),
-        random.randint(HEADER_HEIGHT + gutter, SCREEN_HEIGHT - FOOTER_HEIGHT - gutter),
-    )
-
-def get_lan_ip() -> str:
-    """Get LAN IP address."""
-    try:
-        hostname = socket.gethostname()
-        ip_address = socket.gethostbyname(hostname)
-        return ip_address
-    except socket.error as e:
-        print("Error:", e)
-        return ""
-
-def get_wifi_ip() -> str:
-    """Get WiFi IP address."""
-    try:
-        ipconfig_output = subprocess.check_output(["ipconfig", "/all"], universal_newlines=True)
-        wifi_info = re.findall(r"Wireless LAN adapter WiFi.*?IPv4 Address[.\s]*:\s*([\d.]+)", ipconfig_output, re.DOTALL)
-        if wifi_info:
-            return str(wifi_info[0])
-        else:
-            return ""
-    except subprocess.CalledProcessError as e:
-        print("Error:", e)
-        return ""
-
-# Server IP address
-SERVER = get_wifi_ip() or get_lan_ip()
+import os
+import random
+import time
+from collections import namedtuple
+
+
+WINNING_POINTS = 20
+
+# Screen Constants
+FPS = 60
+SCREEN_WIDTH = 1000
+SCREEN_HEIGHT = 800
+HEADER_HEIGHT = 54
+FOOTER_HEIGHT = 38
+SCORECARD_HEIGHT = 28
+SCORECARD_WIDTH = SCREEN_WIDTH // 6
+# Rows shown on the scoreboard; the local player is pinned to the last one
+SCOREBOARD_ROWS = 10
+SCREEN_COLOR = (253, 252, 238)
+
+ACCENT_PINK = (255, 144, 232)
+ACCENT_YELLOW = (255, 201, 0)
+# The colors the static window chrome is rendered with
+Theme = namedtuple("Theme", ["background", "primary", "secondary"])
+DEFAULT_THEME = Theme(SCREEN_COLOR, ACCENT_PINK, ACCENT_YELLOW)
+# Rendered text surfaces kept by draw.TEXT_CACHE
+TEXT_CACHE_SIZE = 256
+
+# Player Constants
+PLAYER_WIDTH = 64
+PLAYER_HEIGHT = 64
+CHARACTER_COLORS = ["blue", "green", "pink", "purple", "red", "yellow"]
+PLAYER_LIMIT_LEFT = SCORECARD_WIDTH
+PLAYER_LIMIT_RIGHT = SCREEN_WIDTH
+PLAYER_LIMIT_TOP = HEADER_HEIGHT
+PLAYER_LIMIT_DOWN = SCREEN_HEIGHT - FOOTER_HEIGHT
+
+# Coin Constants
+COIN_RADIUS = 16
+COIN_COLOR = (255, 215, 0)
+MAX_COINS = 5
+MIN_COIN_MULTIPLIER = 1.0
+MAX_COIN_MULTIPLIER = 1.7
+# Pre-scaled coin sprites spanning the multiplier range
+COIN_SIZE_STEPS = 8
+# Large enough for a player rect or the widest coin to span at most 2x2 cells
+COIN_GRID_CELL_SIZE = max(PLAYER_WIDTH, int(2 * COIN_RADIUS * MAX_COIN_MULTIPLIER) + 1)
+MIN_GENERATE_INTERVAL = 1
+MAX_GENERATE_INTERVAL = 5
+
+# Networking Constants
+PORT = 5555
+# Overrides the server address clients connect to and the server binds to
+SERVER_ENV = "COIN_BASE_SERVER"
+# A detected address is remembered here for a day so startup skips detection
+SERVER_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "coin-base", "server")
+SERVER_CACHE_TTL = 24 * 60 * 60
+BUFFER_SIZE = 2048
+TICK_RATE = 30
+SNAPSHOT_HISTORY = 64
+# Clients render opponents this many server ticks in the past, so there is
+# normally a newer snapshot to interpolate towards
+INTERPOLATION_TICKS = 2
+SNAPSHOT_BUFFER = 32
+# Rooms: players per room behind the lobby, rooms per worker process, and how
+# long a finished match shows its winner before the room is recycled
+ROOM_CAPACITY = 16
+ROOMS_PER_WORKER = 4
+ROOM_RECYCLE_DELAY = 10
+# A lobby redirect holds a place in its room until the player joins or this expires
+RESERVATION_TIMEOUT = 5
+# Inputs repeated in every UDP datagram, so one lost datagram loses no input
+INPUT_REDUNDANCY = 4
+# Seconds a client that accepted UDP waits for its first datagram from the
+# server before giving up on UDP and staying on TCP
+UDP_CONFIRM_TIMEOUT = 2
+# Outbound backpressure: bytes a connection may have buffered before new
+# snapshots are dropped for it, and how long it may stay that backed up
+# before it is disconnected
+OUTBOUND_LIMIT = 64 * 1024
+SLOW_CLIENT_TIMEOUT = 5
+
+def max_inputs_per_tick(tick_rate: int) -> int:
+    """Inputs applied per player per tick: one per client frame plus some slack."""
+    return -(-FPS // tick_rate) + 1
+
+def get_coin_multiplier() -> float:
+    """Generate random coin multiplier between 1.0 and 1.7."""
+    return MIN_COIN_MULTIPLIER + random.random() * (MAX_COIN_MULTIPLIER - MIN_COIN_MULTIPLIER)
+
+def generate_coin() -> tuple:
+    """Generate a random coin position and multiplier."""
+    coin_pos = get_random_pos(20)
+    multiplier = get_coin_multiplier()
+    return coin_pos, multiplier
+
+def get_random_color() -> tuple:
+    """Generate random RGB color."""
+    return (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
+
+def get_random_character() -> str:
+    """Choose random character color."""
+    return random.choice(CHARACTER_COLORS)
+
+def get_random_pos(gutter: int = 50) -> tuple:
+    """Generate random position within screen bounds."""
+    return (
+        random.randint(SCORECARD_WIDTH + gutter, SCREEN_WIDTH - gutter),
+        random.randint(HEADER_HEIGHT + gutter, SCREEN_HEIGHT - FOOTER_HEIGHT - gutter),
+    )
+
+def get_lan_ip() -> str:
+    """Get LAN IP address."""
+    import socket
+
+    try:
+        hostname = socket.gethostname()
+        ip_address = socket.gethostbyname(hostname)
+        return ip_address
+    except socket.error as e:
+        print("Error:", e)
+        return ""
+
+def get_wifi_ip() -> str:
+    """Get WiFi IP address."""
+    # imported here so importing the constants above stays cheap
+    import re
+    import subprocess
+
+    try:
+        ipconfig_output = subprocess.check_output(["ipconfig", "/all"], universal_newlines=True)
+        wifi_info = re.findall(r"Wireless LAN adapter WiFi.*?IPv4 Address[.\s]*:\s*([\d.]+)", ipconfig_output, re.DOTALL)
+        if wifi_info:
+            return str(wifi_info[0])
+        else:
+            return ""
+    except (subprocess.CalledProcessError, OSError) as e:
+        print("Error:", e)
+        return ""
+
+def read_cached_server() -> str:
+    """Return the cached server address, or "" if missing or older than SERVER_CACHE_TTL."""
+    try:
+        if time.time() - os.path.getmtime(SERVER_CACHE_FILE) > SERVER_CACHE_TTL:
+            return ""
+        with open(SERVER_CACHE_FILE) as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+def write_cached_server(address: str) -> None:
+    """Remember a detected server address; failures only cost a slower next start."""
+    try:
+        os.makedirs(os.path.dirname(SERVER_CACHE_FILE), exist_ok=True)
+        with open(SERVER_CACHE_FILE, "w") as f:
+            f.write(address)
+    except OSError as e:
+        print("Error:", e)
+
+_server_address = None
+
+def get_server_address(refresh: bool = False) -> str:
+    """
+    Resolve the server address on first use and remember it.
+
+    The ``COIN_BASE_SERVER`` environment variable wins, then an address
+    cached on disk by an earlier run, then detection via ipconfig and the
+    hostname, whose result is cached for the next run.
+
+    Args:
+        refresh (bool): Ignore the remembered and cached addresses and detect again.
+
+    Returns:
+        str: The server IP address, or "" if none could be found.
+    """
+    global _server_address
+    if _server_address is not None and not refresh:
+        return _server_address
+
+    address = os.environ.get(SERVER_ENV, "")
+    if not address:
+        address = "" if refresh else read_cached_server()
+        if not address:
+            address = get_wifi_ip() or get_lan_ip()
+            if address:
+                write_cached_server(address)
+    _server_address = address
+    return address
+
+def __getattr__(name):
+    # SERVER used to be detected at import time; keep it available, lazily
+    if name == "SERVER":
+        return get_server_address()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
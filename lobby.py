@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import deque
+from protocol import encode_redirect
+from game_config import ROOM_CAPACITY, RESERVATION_TIMEOUT
+
+
+class Lobby:
+    """
+    Assigns connecting players to rooms hosted by worker processes.
+
+    Workers report each room's player count and whether its match is still
+    open; the lobby adds the players it has redirected that have not shown up
+    in a report yet. New players go to the fullest open room with a free
+    place, so matches fill up one at a time instead of spreading thin.
+    """
+
+    def __init__(self, rooms, capacity=ROOM_CAPACITY, reservation_timeout=RESERVATION_TIMEOUT):
+        """
+        Initialize a lobby with every room empty and open.
+
+        Args:
+            rooms (dict): Mapping of room id to the port the room listens on.
+            capacity (int): The most players a room takes.
+            reservation_timeout (float): Seconds a redirect holds its place.
+        """
+        self.rooms = dict(rooms)
+        self.capacity = capacity
+        self.reservation_timeout = reservation_timeout
+        self.players = {room_id: 0 for room_id in rooms}
+        self.open = {room_id: True for room_id in rooms}
+        self.reserved = {room_id: deque() for room_id in rooms}
+        self.lock = threading.Lock()
+
+    def update(self, room_id, players, is_open):
+        """
+        Record a worker's report on a room.
+
+        Players who joined since the last report use up the oldest reservations.
+
+        Args:
+            room_id (int): The room reported on.
+            players (int): The players now in the room.
+            is_open (bool): Whether its match is still being played.
+        """
+        with self.lock:
+            reserved = self.reserved[room_id]
+            for _ in range(min(len(reserved), players - self.players[room_id])):
+                reserved.popleft()
+            self.players[room_id] = players
+            self.open[room_id] = is_open
+
+    def load(self, room_id, now):
+        """The players in a room plus the redirects to it still pending. Caller holds lock."""
+        reserved = self.reserved[room_id]
+        while reserved and now - reserved[0] > self.reservation_timeout:
+            reserved.popleft()
+        return self.players[room_id] + len(reserved)
+
+    def assign(self):
+        """
+        Pick a room for a new player and reserve a place in it.
+
+        Returns:
+            tuple or None: (room id, port), or None if every open room is full.
+        """
+        now = time.monotonic()
+        with self.lock:
+            candidates = [
+                (self.load(room_id, now), room_id)
+                for room_id in self.rooms
+                if self.open[room_id]
+            ]
+            candidates = [(load, room_id) for load, room_id in candidates if load < self.capacity]
+            if not candidates:
+                return None
+            # fullest first, then the lowest id
+            _, room_id = min(candidates, key=lambda candidate: (-candidate[0], candidate[1]))
+            self.reserved[room_id].append(now)
+            return room_id, self.rooms[room_id]
+
+    def serve(self, sock):
+        """
+        Answer every connection on ``sock`` with a redirect to a room.
+
+        Connections are closed without an answer while every room is full.
+
+        Args:
+            sock (socket.socket): A bound, listening socket.
+        """
+        while True:
+            conn, addr = sock.accept()
+            with conn:
+                assignment = self.assign()
+                if assignment is None:
+                    print("Lobby full, turning away:", addr)
+                    continue
+                _, port = assignment
+                try:
+                    conn.sendall(encode_redirect(port))
+                except OSError as e:
+                    print("Error:", str(e))
+
+
+def follow_reports(lobby, events):
+    """
+    Feed room reports from the workers into the lobby until the queue closes.
+
+    Args:
+        lobby (Lobby): The lobby to update.
+        events (multiprocessing.Queue): (room id, players, is open) reports.
+    """
+    while True:
+        try:
+            report = events.get()
+        except (EOFError, OSError):
+            return
+        lobby.update(*report)
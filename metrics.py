@@ -0,0 +1,198 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Histogram:
+    """
+    A histogram of durations in power-of-two microsecond buckets.
+
+    Observing is a few arithmetic operations under a lock, cheap enough to
+    leave on in the hot path; percentiles are reported as the upper bound of
+    the bucket they fall in.
+    """
+
+    BUCKETS = 32
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        """Record one duration, in seconds."""
+        index = min(int(seconds * 1e6).bit_length(), self.BUCKETS - 1)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, fraction):
+        """Return the upper bound, in seconds, of the bucket holding a percentile."""
+        with self.lock:
+            counts = list(self.counts)
+            count = self.count
+            largest = self.max
+        rank = fraction * count
+        seen = 0
+        for index, bucket in enumerate(counts):
+            seen += bucket
+            if bucket and seen >= rank:
+                return min((1 << index) / 1e6, largest)
+        return 0.0
+
+    def summary(self):
+        """
+        Summarize the histogram.
+
+        Returns:
+            dict: The count and the mean, p50, p90, p99 and max in milliseconds.
+        """
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50) * 1000, 3),
+            "p90_ms": round(self.percentile(0.90) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class Metrics:
+    """
+    Counters, gauges, duration histograms and per-connection byte counts.
+
+    Everything is aggregated in memory; ``snapshot`` and ``render_text``
+    read the current totals for a stats line or the metrics endpoint.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.connections = {}
+
+    def histogram(self, name):
+        """Return the histogram called ``name``, creating it on first use."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def observe(self, name, seconds):
+        """Record a duration in the histogram called ``name``."""
+        self.histogram(name).observe(seconds)
+
+    def count(self, name, amount=1):
+        """Add ``amount`` to the counter called ``name``."""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name, read):
+        """Register ``read()`` to be sampled as the gauge called ``name``."""
+        self.gauges[name] = read
+
+    def transfer(self, conn_id, received=0, sent=0):
+        """
+        Count bytes received from and sent to a connection.
+
+        Args:
+            conn_id (str): Identifies the connection, e.g. its player id.
+            received (int): Bytes read from the connection.
+            sent (int): Bytes written to the connection.
+        """
+        with self.lock:
+            totals = self.connections.get(conn_id)
+            if totals is None:
+                totals = self.connections[conn_id] = [0, 0]
+            totals[0] += received
+            totals[1] += sent
+            self.counters["bytes_received"] = self.counters.get("bytes_received", 0) + received
+            self.counters["bytes_sent"] = self.counters.get("bytes_sent", 0) + sent
+
+    def drop_connection(self, conn_id):
+        """Forget a closed connection's byte counts; the totals keep them."""
+        with self.lock:
+            self.connections.pop(conn_id, None)
+
+    def snapshot(self, connections=False):
+        """
+        Return the current metrics as a JSON-serializable dict.
+
+        Args:
+            connections (bool): Include bytes received and sent per open connection.
+        """
+        with self.lock:
+            counters = dict(self.counters)
+            per_connection = {
+                conn_id: {"received": received, "sent": sent}
+                for conn_id, (received, sent) in self.connections.items()
+            }
+        snapshot = {
+            "time": round(time.time(), 3),
+            "uptime_s": round(time.time() - self.started, 3),
+            "counters": counters,
+            "gauges": {name: read() for name, read in self.gauges.items()},
+            "histograms": {name: h.summary() for name, h in list(self.histograms.items())},
+        }
+        if connections:
+            snapshot["connections"] = per_connection
+        return snapshot
+
+    def render_text(self):
+        """Return the metrics as ``name value`` lines."""
+        snapshot = self.snapshot()
+        lines = [f"uptime_s {snapshot['uptime_s']}"]
+        for section in ("counters", "gauges"):
+            lines.extend(f"{name} {value}" for name, value in sorted(snapshot[section].items()))
+        for name, summary in sorted(snapshot["histograms"].items()):
+            lines.extend(f"{name}_{stat} {value}" for stat, value in summary.items())
+        return "\n".join(lines) + "\n"
+
+
+def serve_metrics(metrics, host="127.0.0.1", port=9555):
+    """
+    Serve metrics over HTTP from a daemon thread.
+
+    ``/metrics`` returns ``name value`` text; ``/json`` returns the snapshot
+    as JSON, including per-connection byte counts.
+
+    Args:
+        metrics (Metrics): The metrics to expose.
+        host (str): The address to bind to; keep it local.
+        port (int): The port to listen on.
+
+    Returns:
+        ThreadingHTTPServer: The running server.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path in ("/", "/metrics"):
+                body, content_type = metrics.render_text(), "text/plain"
+            elif self.path == "/json":
+                body, content_type = json.dumps(metrics.snapshot(connections=True)), "application/json"
+            else:
+                self.send_error(404)
+                return
+            body = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
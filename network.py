@@ -1,72 +1,533 @@
-import socket
-import pickle
-from game_config import SERVER, PORT
-
-class Network:
-    """
-    A class to handle network communication with the server.
-
-    Attributes:
-        server (str): The IP address of the server.
-        port (int): The port number for communication.
-        addr (tuple): A tuple containing the server IP address and port number.
-        client (socket.socket): The client socket object.
-        player (str): The unique identifier received upon connection.
-    """
-
-    def __init__(self, server=SERVER, port=PORT):
-        """
-        Initializes the Network object with the server address and port.
-
-        Args:
-            server (str): The IP address of the server. Defaults to the value in game_config.
-            port (int): The port number for communication. Defaults to 5555.
-        """
-        self.server = server
-        self.port = port
-        self.addr = (self.server, self.port)
-        self.client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.player = self.connect()
-
-    def getPlayer(self):
-        return self.player
-
-    def connect(self):
-        """
-        Connects to the server and receives a unique identifier upon successful connection.
-
-        Returns:
-            str: The unique identifier received from the server.
-        """
-        try:
-            self.client.connect(self.addr)
-            return pickle.loads(self.client.recv(2048))
-        except Exception as e:
-            print("Error connecting to the server:", e)
-            return None
-
-    def send(self, data):
-        """
-        Sends data to the server and receives a response.
-
-        Args:
-            data (str): The data to be sent to the server.
-
-        Returns:
-            str: The response received from the server.
-        """
-        try:
-            self.client.send(pickle.dumps(data))
-            return pickle.loads(self.client.recv(2048))
-        except Exception as e:
-            print("Error sending data:", e)
-            return None
-
-    def disconnect(self):
-        """
-        Disconnects from the server.
-        """
-        try:
-            self.client.close()
-        except Exception as e:
-            print("Error disconnecting from the server:", e)
+import os
+import select
+import socket
+import threading
+import time
+from collections import deque
+from game_config import (
+    PORT,
+    INPUT_REDUNDANCY,
+    INTERPOLATION_TICKS,
+    SERVER_ENV,
+    TICK_RATE,
+    UDP_CONFIRM_TIMEOUT,
+    get_server_address,
+)
+from player import Player
+from player_state import move_position
+from protocol import (
+    FrameReader,
+    ProtocolError,
+    MSG_HELLO,
+    MSG_REDIRECT,
+    MSG_SNAPSHOT,
+    MSG_UDP_OFFER,
+    MSG_WINNER,
+    read_frame,
+    iter_frames,
+    encode_datagram,
+    encode_input,
+    decode_hello,
+    decode_redirect,
+    decode_snapshot,
+    decode_udp_offer,
+    decode_winner,
+)
+from snapshot import EMPTY_STATE, SnapshotBuffer, SnapshotHistory, apply_delta
+
+
+def open_socket():
+    """Create the TCP socket used to talk to the server, with Nagle disabled."""
+    client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return client
+
+
+class Network:
+    """
+    A class to handle network communication with the server.
+
+    ``send`` does a blocking round trip. After ``start``, a background thread
+    owns the socket instead: ``post_input`` queues input for it and ``poll``
+    returns the latest snapshot without blocking. In that mode the local player
+    is predicted from its own input and reconciled with each snapshot, and
+    opponents are interpolated between snapshots ``INTERPOLATION_TICKS``
+    server ticks in the past, at the tick rate the server sent in its hello.
+
+    With ``udp`` set and a server that offers it, the background thread sends
+    inputs and receives snapshots as datagrams, so a lost packet delays only
+    itself. Each datagram repeats the last ``INPUT_REDUNDANCY`` inputs and
+    snapshots older than the newest applied are dropped. Until the first
+    datagram from the server arrives, inputs also go over TCP; if none has
+    arrived after ``UDP_CONFIRM_TIMEOUT`` seconds, UDP is given up and the
+    connection stays on TCP, so a path that blocks UDP costs nothing.
+
+    Attributes:
+        server (str): The IP address of the server.
+        resolved (bool): Whether the address came from get_server_address
+            rather than the caller.
+        port (int): The port number for communication.
+        addr (tuple): A tuple containing the server IP address and port number.
+        client (socket.socket): The client socket object.
+        reader (FrameReader): Reassembles frames received from the server.
+        history (SnapshotHistory): Recently received world states, keyed by sequence.
+        state (WorldState): The latest world state received from the server.
+        ack (int): The sequence of the latest snapshot applied, sent back to the server.
+        input_seq (int): The sequence number of the latest input sent.
+        applied_input_seq (int): The latest input the server has applied, per the last snapshot.
+        opponents (dict): Opponent Player objects kept up to date from snapshots.
+        interpolation_delay (float): Seconds in the past opponents are drawn.
+        player (Player): The player assigned by the server upon connection.
+        lock (threading.Lock): Guards the input queue and the latest snapshot slot.
+        pending_inputs (list): Encoded inputs waiting for the background thread.
+        latest (tuple): (state, winner, multiplier, applied_input_seq) of the newest snapshot.
+        snapshots (SnapshotBuffer): Received states stamped with their arrival time.
+        unacked_inputs (list): (seq, keys) of predicted inputs the server has not applied yet.
+        thread (threading.Thread): The background network thread, once started.
+        bytes_sent (int): Bytes written to the server socket; ``reader.received`` counts the other way.
+        track_opponents (bool): Whether ``poll`` keeps interpolated opponents up to date.
+        udp (bool): Whether to accept the server's offer to use UDP.
+        datagram (socket.socket): The UDP socket, once the server's offer was accepted.
+        datagram_token (int): The token every datagram to the server starts with.
+        datagram_received (int): Bytes received as datagrams.
+        datagram_deadline (float): When to give up on UDP if no datagram has
+            arrived by then; None once one has.
+        recent_inputs (collections.deque): The inputs repeated in the next datagram.
+        last_seq (int): The newest snapshot applied; older ones arriving late are dropped.
+        winner (str): The winner's name once announced.
+    """
+
+    def __init__(self, server=None, port=PORT, track_opponents=True, udp=False):
+        """
+        Initializes the Network object with the server address and port.
+
+        Args:
+            server (str): The IP address of the server. Defaults to get_server_address().
+            port (int): The port number for communication. Defaults to 5555.
+            track_opponents (bool): False for headless clients that never draw
+                opponents, which skips buffering and interpolating them.
+            udp (bool): Exchange inputs and snapshots over UDP if the server offers it.
+        """
+        self.resolved = not server
+        self.server = server or get_server_address()
+        self.port = port
+        self.track_opponents = track_opponents
+        self.addr = (self.server, self.port)
+        self.client = open_socket()
+        self.reader = FrameReader()
+        self.history = SnapshotHistory()
+        self.state = EMPTY_STATE
+        self.ack = 0
+        self.input_seq = 0
+        self.applied_input_seq = 0
+        self.opponents = {}
+        self.interpolation_delay = INTERPOLATION_TICKS / TICK_RATE
+        self.lock = threading.Lock()
+        self.pending_inputs = []
+        self.latest = (EMPTY_STATE, None, 0, 0)
+        self.snapshots = SnapshotBuffer()
+        self.unacked_inputs = []
+        self.rendered_state = None
+        self.thread = None
+        self.running = False
+        self.bytes_sent = 0
+        self.udp = udp
+        self.datagram = None
+        self.datagram_token = None
+        self.datagram_received = 0
+        self.datagram_deadline = None
+        self.recent_inputs = deque(maxlen=INPUT_REDUNDANCY)
+        self.last_seq = 0
+        self.winner = None
+        self.wake_reader, self.wake_writer = socket.socketpair()
+        self.wake_writer.setblocking(False)
+        self.player = self.connect()
+
+    def getPlayer(self):
+        return self.player
+
+    def connect(self):
+        """
+        Connects to the server and receives the player assigned to this client.
+
+        If the server is a lobby, it answers with a redirect and the client
+        reconnects to the room it was assigned.
+
+        Returns:
+            Player: The player built from the server's hello message.
+        """
+        try:
+            self.open_connection()
+            msg_type, payload = read_frame(self.client, self.reader)
+            if msg_type == MSG_REDIRECT:
+                # A lobby answered: reconnect to the room it assigned
+                self.port = decode_redirect(payload)
+                self.addr = (self.server, self.port)
+                self.client.close()
+                self.client = open_socket()
+                self.reader = FrameReader()
+                self.client.connect(self.addr)
+                msg_type, payload = read_frame(self.client, self.reader)
+            if msg_type != MSG_HELLO:
+                raise ConnectionError(f"Expected hello, got message type {msg_type}")
+            hello = decode_hello(payload)
+            self.interpolation_delay = INTERPOLATION_TICKS / hello["tick_rate"]
+            player = Player(
+                hello["id"],
+                hello["x"],
+                hello["y"],
+                hello["width"],
+                hello["height"],
+                hello["character"],
+            )
+            player.color = hello["color"]
+            return player
+        except Exception as e:
+            print("Error connecting to the server:", e)
+            return None
+
+    def open_connection(self):
+        """
+        Connect the socket to the server.
+
+        A resolved address may be a cached one from a network this machine
+        has since left; if connecting to it fails, the address is detected
+        again, which also replaces the cached one, and the connection is
+        retried once.
+        """
+        try:
+            self.client.connect(self.addr)
+        except OSError:
+            if not self.resolved or os.environ.get(SERVER_ENV):
+                raise
+            server = get_server_address(refresh=True)
+            if not server or server == self.server:
+                raise
+            print(f"Cannot reach {self.server}, trying {server}")
+            self.server = server
+            self.addr = (self.server, self.port)
+            self.client.close()
+            self.client = open_socket()
+            self.client.connect(self.addr)
+
+    def send(self, keys):
+        """
+        Sends the player's input to the server and waits for a snapshot that includes it.
+
+        The local player is updated in place from the server's authoritative state.
+
+        Args:
+            keys (int): The key-state bitmask for this frame.
+
+        Returns:
+            dict: The winner, opponents, coins and grabbed coin multiplier.
+        """
+        try:
+            self.input_seq += 1
+            message = encode_input(self.ack, self.input_seq, time.monotonic(), keys)
+            self.client.sendall(message)
+            self.bytes_sent += len(message)
+            winner = None
+            multiplier = 0
+            while self.applied_input_seq < self.input_seq:
+                msg_type, payload = read_frame(self.client, self.reader)
+                if msg_type == MSG_WINNER:
+                    winner = decode_winner(payload)
+                elif msg_type == MSG_SNAPSHOT:
+                    grabbed = self.apply_snapshot(payload)
+                    if grabbed is not None:
+                        multiplier = grabbed
+            return self.build_response(self.state, winner, multiplier)
+        except Exception as e:
+            print("Error sending data:", e)
+            return None
+
+    def start(self):
+        """Hand the socket to a background thread and return immediately."""
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def post_input(self, keys):
+        """
+        Queue this frame's input for the background thread without blocking.
+
+        The input is applied to the local player straight away and replayed on
+        top of each snapshot until the server acknowledges it.
+
+        Args:
+            keys (int): The key-state bitmask for this frame.
+        """
+        with self.lock:
+            self.input_seq += 1
+            self.pending_inputs.append((self.input_seq, time.monotonic(), keys))
+        self.unacked_inputs.append((self.input_seq, keys))
+        self.player.move(keys)
+        self.wake()
+
+    def wake(self):
+        """Wake the background thread; a wake-up already pending is enough."""
+        try:
+            self.wake_writer.send(b"\0")
+        except BlockingIOError:
+            pass
+
+    def poll(self):
+        """
+        Return the latest snapshot received by the background thread.
+
+        Never blocks on the network. On the calling thread, the local player
+        is reconciled with the newest state and opponents are moved to their
+        interpolated positions.
+
+        Returns:
+            dict: The winner, opponents, coins and grabbed coin multiplier.
+        """
+        render_time = time.monotonic() - self.interpolation_delay
+        with self.lock:
+            state, winner, multiplier, applied_input_seq = self.latest
+            players = self.snapshots.sample(render_time) if self.track_opponents else None
+        if state is not self.rendered_state:
+            self.rendered_state = state
+            self.reconcile(state.players.get(self.player.id), applied_input_seq)
+        if players is not None:
+            self.update_opponents(players)
+        return {
+            "winner": winner,
+            "opponents": self.opponents,
+            "coins": state.coins,
+            "multiplier": multiplier,
+        }
+
+    def run(self):
+        """Background thread: send queued input and apply incoming snapshots."""
+        try:
+            while self.running:
+                sockets = [self.client, self.wake_reader]
+                if self.datagram is not None:
+                    sockets.append(self.datagram)
+                readable, _, _ = select.select(sockets, [], [])
+                if self.wake_reader in readable:
+                    self.wake_reader.recv(4096)
+                    with self.lock:
+                        inputs, self.pending_inputs = self.pending_inputs, []
+                    if inputs:
+                        self.send_inputs(inputs)
+                if self.datagram is not None and self.datagram in readable:
+                    self.receive_datagram()
+                if self.client not in readable:
+                    continue
+                if not self.reader.recv_from(self.client):
+                    raise ConnectionError("Connection closed by server")
+                message = self.reader.next_frame()
+                while message is not None:
+                    self.handle_message(*message)
+                    message = self.reader.next_frame()
+        except Exception as e:
+            if self.running:
+                print("Error receiving data:", e)
+        finally:
+            self.running = False
+
+    def send_inputs(self, inputs):
+        """
+        Send queued inputs, as a datagram once UDP is in use and over TCP otherwise.
+
+        While UDP is unconfirmed they go both ways, and once its deadline
+        passes UDP is closed.
+
+        Args:
+            inputs (list): (seq, timestamp, keys) of each input, oldest first.
+        """
+        if self.datagram_deadline is not None and time.monotonic() > self.datagram_deadline:
+            print("No datagrams from the server, staying on TCP")
+            self.close_datagram()
+        if self.datagram is None or self.datagram_deadline is not None:
+            message = b"".join(encode_input(self.ack, *player_input) for player_input in inputs)
+            self.client.sendall(message)
+            self.bytes_sent += len(message)
+        if self.datagram is not None:
+            # Repeat the previous few inputs so a lost datagram loses none of them
+            frames = [*self.recent_inputs, *inputs]
+            self.recent_inputs.extend(inputs)
+            message = encode_datagram(
+                self.datagram_token,
+                b"".join(encode_input(self.ack, *player_input) for player_input in frames),
+            )
+            try:
+                self.datagram.send(message)
+            except OSError:
+                # e.g. an ICMP error for an earlier datagram; treat it as loss
+                pass
+            self.bytes_sent += len(message)
+
+    def receive_datagram(self):
+        """Apply the frames of one datagram from the server, dropping it if malformed."""
+        try:
+            data = self.datagram.recv(65535)
+        except OSError:
+            return
+        self.datagram_received += len(data)
+        # the path works both ways: inputs need not go over TCP any more
+        self.datagram_deadline = None
+        try:
+            for msg_type, payload in iter_frames(data):
+                self.handle_message(msg_type, payload)
+        except ProtocolError:
+            pass
+
+    def handle_message(self, msg_type, payload):
+        """Apply one message from the server, whichever channel it came on."""
+        if msg_type == MSG_WINNER:
+            self.winner = decode_winner(payload)
+        elif msg_type == MSG_UDP_OFFER:
+            if self.udp:
+                self.open_datagram(decode_udp_offer(payload))
+        elif msg_type == MSG_SNAPSHOT:
+            multiplier = self.apply_snapshot(payload)
+            if multiplier is None:
+                return
+            received_at = time.monotonic()
+            with self.lock:
+                if self.track_opponents and self.state is not self.latest[0]:
+                    self.snapshots.push(received_at, self.state)
+                self.latest = (self.state, self.winner, multiplier, self.applied_input_seq)
+
+    def open_datagram(self, token):
+        """Accept the server's UDP offer: open a socket to the server's port."""
+        datagram = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        datagram.connect(self.addr)
+        self.datagram_token = token
+        self.datagram = datagram
+        self.datagram_deadline = time.monotonic() + UDP_CONFIRM_TIMEOUT
+
+    def close_datagram(self):
+        """Give up on UDP: further inputs go over TCP only."""
+        self.datagram.close()
+        self.datagram = None
+        self.datagram_deadline = None
+
+    def build_response(self, state, winner, multiplier):
+        """
+        Bring the local Player objects up to date with a world state.
+
+        Returns:
+            dict: The winner, opponents, coins and grabbed coin multiplier.
+        """
+        if state is not self.rendered_state:
+            self.rendered_state = state
+            self.update_player(state.players.get(self.player.id))
+            self.update_opponents(state.players)
+        return {
+            "winner": winner,
+            "opponents": self.opponents,
+            "coins": state.coins,
+            "multiplier": multiplier,
+        }
+
+    def apply_snapshot(self, payload):
+        """
+        Apply a snapshot to the state it was delta-encoded against.
+
+        If that base state is no longer known, the snapshot is dropped and the
+        acknowledgement is reset so the server answers with a keyframe.
+        Snapshots older than the newest one applied, which datagrams can
+        deliver out of order, are dropped.
+
+        Args:
+            payload (bytes): The snapshot message payload.
+
+        Returns:
+            float or None: The multiplier of the coin the player grabbed, or 0;
+            None if the snapshot was stale or dropped for lack of its base.
+        """
+        seq, base_seq, applied_input_seq, multiplier, delta = decode_snapshot(payload)
+        if seq <= self.last_seq:
+            return None
+        base = self.history.get(base_seq) if base_seq else None
+        if base_seq and base is None:
+            self.ack = 0
+            return None
+
+        self.applied_input_seq = applied_input_seq
+        self.state = apply_delta(base, delta)
+        self.history.record(seq, self.state)
+        self.history.discard_before(base_seq)
+        self.ack = self.last_seq = seq
+        return multiplier
+
+    def update_player(self, record):
+        """
+        Update the local player from its record in the world state.
+
+        Args:
+            record (tuple or None): (x, y, score, direction, character, color).
+        """
+        if record is None:
+            return
+        self.player.x, self.player.y, self.player.score, self.player.direction = record[:4]
+        self.player.update()
+
+    def reconcile(self, record, applied_input_seq):
+        """
+        Reset the predicted local player to its authoritative state.
+
+        Inputs the server has applied are dropped; the rest are replayed on
+        top of the server's position so the prediction stays ahead of it.
+
+        Args:
+            record (tuple or None): (x, y, score, direction, character, color).
+            applied_input_seq (int): The latest input the server has applied.
+        """
+        if record is None:
+            return
+        self.unacked_inputs = [
+            (seq, keys) for seq, keys in self.unacked_inputs if seq > applied_input_seq
+        ]
+        player = self.player
+        x, y, player.score, direction = record[:4]
+        for _, keys in self.unacked_inputs:
+            x, y, direction = move_position(x, y, direction, keys, player.height, player.vel)
+        player.x, player.y, player.direction = x, y, direction
+        player.update()
+
+    def update_opponents(self, players):
+        """
+        Update the opponent Player objects from the world state.
+
+        Args:
+            players (dict): Mapping of player id to
+                (x, y, score, direction, character, color).
+        """
+        opponents = {}
+        for player_id, (x, y, score, direction, character, color) in players.items():
+            if player_id == self.player.id:
+                continue
+            opp = self.opponents.get(player_id)
+            if opp is None:
+                opp = Player(player_id, x, y, self.player.width, self.player.height, character)
+                opp.color = color
+            opp.x = x
+            opp.y = y
+            opp.score = score
+            opp.direction = direction
+            opp.update()
+            opponents[player_id] = opp
+        self.opponents = opponents
+
+    def disconnect(self):
+        """
+        Disconnects from the server, stopping the background thread if running.
+        """
+        self.running = False
+        try:
+            self.wake()
+            if self.thread is not None and self.thread is not threading.current_thread():
+                self.thread.join()
+            self.client.close()
+            if self.datagram is not None:
+                self.datagram.close()
+            self.wake_reader.close()
+            self.wake_writer.close()
+        except Exception as e:
+            print("Error disconnecting from the server:", e)
@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import deque
+from game_config import OUTBOUND_LIMIT, SLOW_CLIENT_TIMEOUT
+
+
+def buffers_size(buffers):
+    """The total length of a list of bytes-like objects."""
+    return sum(len(buffer) for buffer in buffers)
+
+
+class Outbox:
+    """
+    The bounded outbound queue of one connection.
+
+    A snapshot is superseded by the next one, so at most one waits to be
+    sent: a newer snapshot replaces it and the old one is counted as dropped.
+    Other frames are queued and never dropped. A connection whose snapshots
+    keep being dropped for ``slow_timeout`` seconds is reported as slow, so
+    the server can disconnect it instead of buffering for it.
+
+    In threaded mode a sender thread blocks in ``take`` and sends over the
+    socket; in asyncio mode the tick calls ``take_nowait`` with the bytes
+    still in the transport's buffer.
+    """
+
+    def __init__(self, metrics, limit=OUTBOUND_LIMIT, slow_timeout=SLOW_CLIENT_TIMEOUT):
+        """
+        Initialize an empty outbox.
+
+        Args:
+            metrics (Metrics): Counts dropped snapshots and slow clients.
+            limit (int): Bytes the connection may hold unsent below the outbox
+                before nothing more is handed to it.
+            slow_timeout (float): Seconds the connection may stay backed up.
+        """
+        self.metrics = metrics
+        self.limit = limit
+        self.slow_timeout = slow_timeout
+        self.ready = threading.Condition()
+        self.frames = deque()
+        self.snapshot = None
+        self.queued = 0
+        self.in_flight = 0
+        self.backed_up_since = None
+        self.closed = False
+
+    def depth(self):
+        """Bytes queued here plus those handed to the connection and not yet sent."""
+        return self.queued + self.in_flight
+
+    def put(self, frame):
+        """Queue a frame that must not be dropped, such as the winner."""
+        with self.ready:
+            if self.closed:
+                return
+            self.frames.append(frame)
+            self.queued += len(frame)
+            self.ready.notify()
+
+    def put_snapshot(self, reply):
+        """
+        Queue a snapshot reply, replacing an older one still waiting.
+
+        Args:
+            reply (list): The buffers of the reply.
+
+        Returns:
+            bool: False once the connection has been backed up for longer
+            than ``slow_timeout``; the caller should disconnect it.
+        """
+        with self.ready:
+            if self.closed:
+                return True
+            if self.snapshot is not None:
+                self.queued -= buffers_size(self.snapshot)
+                self.metrics.count("snapshots_dropped")
+                now = time.monotonic()
+                if self.backed_up_since is None:
+                    self.backed_up_since = now
+                elif now - self.backed_up_since > self.slow_timeout:
+                    self.metrics.count("slow_clients_kicked")
+                    return False
+            self.snapshot = reply
+            self.queued += buffers_size(reply)
+            self.ready.notify()
+            return True
+
+    def pop(self):
+        """Empty the outbox into a list of buffers. Caller holds ``ready``."""
+        buffers = list(self.frames)
+        self.frames.clear()
+        if self.snapshot is not None:
+            buffers.extend(self.snapshot)
+            self.snapshot = None
+            self.backed_up_since = None
+        self.queued = 0
+        return buffers
+
+    def take(self):
+        """
+        Wait for something to send and take all of it.
+
+        Returns:
+            list or None: The buffers to send in order, or None once closed.
+        """
+        with self.ready:
+            while not self.closed and self.snapshot is None and not self.frames:
+                self.ready.wait()
+            if self.closed:
+                return None
+            buffers = self.pop()
+            self.in_flight = buffers_size(buffers)
+            return buffers
+
+    def sent(self):
+        """Record that the buffers from ``take`` have been sent."""
+        with self.ready:
+            self.in_flight = 0
+
+    def take_nowait(self, buffered):
+        """
+        Take everything queued if the connection has room for it.
+
+        Args:
+            buffered (int): Bytes the connection still holds unsent.
+
+        Returns:
+            list: The buffers to send in order; empty while the connection
+            is over ``limit`` or there is nothing to send.
+        """
+        with self.ready:
+            self.in_flight = buffered
+            if buffered > self.limit:
+                return []
+            return self.pop()
+
+    def close(self):
+        """Drop whatever is queued and wake the sender."""
+        with self.ready:
+            self.closed = True
+            self.frames.clear()
+            self.snapshot = None
+            self.queued = 0
+            self.ready.notify_all()
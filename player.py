@@ -1,86 +1,92 @@
-import pygame
-from game_config import (
-    get_random_color,
-    PLAYER_LIMIT_LEFT,
-    PLAYER_LIMIT_RIGHT,
-    PLAYER_LIMIT_DOWN,
-    PLAYER_LIMIT_TOP,
-)
-
-PLAYER_VELOCITY = 5
-
-
-class Player:
-    """A class representing a player."""
-
-    def __init__(self, player_id, x, y, width, height, character_color):
-        """
-        Initialize a Player object.
-
-        Args:
-            player_id (int): The unique identifier for the player.
-            x (int): The x-coordinate of the player's top-left corner.
-            y (int): The y-coordinate of the player's top-left corner.
-            width (int): The width of the player.
-            height (int): The height of the player.
-            character_color (tuple): The RGB color tuple representing the player's character.
-        """
-        self.id = player_id
-        self.name = f"guest_{str(player_id)[:4]}"
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
-        self.score = 0
-        self.character = character_color
-        self.color = get_random_color()
-        self.rect = pygame.Rect(x, y, width, height)
-        self.direction = "left"
-        self.vel = PLAYER_VELOCITY
-
-    def move(self):
-        """Move the player based on key inputs."""
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT] and self.x > (PLAYER_LIMIT_LEFT + 2):
-            self.x -= self.vel
-        if keys[pygame.K_RIGHT] and self.x < (PLAYER_LIMIT_RIGHT - self.height -2):
-            self.x += self.vel
-        if keys[pygame.K_UP] and self.y > (PLAYER_LIMIT_TOP + 2):
-            self.y -= self.vel
-        if keys[pygame.K_DOWN] and self.y < (PLAYER_LIMIT_DOWN - self.height - 2):
-            self.y += self.vel
-        self.update()
-
-    def update(self):
-        """Update the player's rectangle."""
-        self.rect = pygame.Rect(self.x, self.y, self.width, self.height)
-
-    def update_score(self, multiplier=1):
-        """Update the player's score."""
-        self.score += 1 * multiplier
-        # print(self.score)
-
-    def get_player_details(self):
-        """
-        Get details of the player as a dictionary.
-
-        Returns:
-            dict: A dictionary containing the player's details.
-        """
-        return {
-            "id": self.id,
-            "name": self.name,
-            "score": self.score,
-            "navigation": {
-                "x": self.x,
-                "y": self.y,
-                "direction": self.direction,
-                "vel": self.vel,
-            },
-            "details": {
-                "width": self.width,
-                "height": self.height,
-                "character": self.character,
-                "color": self.color,
-            },
-        }
+import pygame
+from player_state import (
+    KEY_DOWN,
+    KEY_LEFT,
+    KEY_RIGHT,
+    KEY_UP,
+    PlayerState,
+)
+
+
+def read_keys():
+    """Read the arrow keys into a key-state bitmask."""
+    pressed = pygame.key.get_pressed()
+    keys = 0
+    if pressed[pygame.K_LEFT]:
+        keys |= KEY_LEFT
+    if pressed[pygame.K_RIGHT]:
+        keys |= KEY_RIGHT
+    if pressed[pygame.K_UP]:
+        keys |= KEY_UP
+    if pressed[pygame.K_DOWN]:
+        keys |= KEY_DOWN
+    return keys
+
+
+def state_attribute(name):
+    """A property that reads and writes ``name`` on the wrapped PlayerState."""
+    return property(
+        lambda self: getattr(self.state, name),
+        lambda self, value: setattr(self.state, name, value),
+    )
+
+
+class Player:
+    """A class representing a player, wrapping its PlayerState for rendering."""
+
+    id = state_attribute("id")
+    name = state_attribute("name")
+    x = state_attribute("x")
+    y = state_attribute("y")
+    width = state_attribute("width")
+    height = state_attribute("height")
+    score = state_attribute("score")
+    direction = state_attribute("direction")
+    input_seq = state_attribute("input_seq")
+    character = state_attribute("character")
+    color = state_attribute("color")
+    vel = property(lambda self: self.state.vel)
+
+    def __init__(self, player_id, x, y, width, height, character_color):
+        """
+        Initialize a Player object.
+
+        Args:
+            player_id (int): The unique identifier for the player.
+            x (int): The x-coordinate of the player's top-left corner.
+            y (int): The y-coordinate of the player's top-left corner.
+            width (int): The width of the player.
+            height (int): The height of the player.
+            character_color (tuple): The RGB color tuple representing the player's character.
+        """
+        self.state = PlayerState(player_id, x, y, width, height, character_color)
+        self.rect = pygame.Rect(x, y, width, height)
+
+    def move(self, keys=None):
+        """
+        Move the player based on key inputs.
+
+        Args:
+            keys (int, optional): A key-state bitmask; read from the keyboard if omitted.
+        """
+        if keys is None:
+            keys = read_keys()
+        self.state.move(keys)
+        self.update()
+
+    def update(self):
+        """Update the player's rectangle."""
+        self.rect = pygame.Rect(self.x, self.y, self.width, self.height)
+
+    def update_score(self, multiplier=1):
+        """Update the player's score."""
+        self.state.update_score(multiplier)
+
+    def get_player_details(self):
+        """
+        Get details of the player as a dictionary.
+
+        Returns:
+            dict: A dictionary containing the player's details.
+        """
+        return self.state.get_player_details()
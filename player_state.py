@@ -0,0 +1,155 @@
+from enum import IntEnum
+from game_config import (
+    get_random_color,
+    PLAYER_LIMIT_LEFT,
+    PLAYER_LIMIT_RIGHT,
+    PLAYER_LIMIT_DOWN,
+    PLAYER_LIMIT_TOP,
+)
+
+PLAYER_VELOCITY = 5
+
+# Key-state bitmask sent by clients
+KEY_LEFT = 1
+KEY_RIGHT = 2
+KEY_UP = 4
+KEY_DOWN = 8
+
+
+class Direction(IntEnum):
+    """The way a player faces; the value is its code on the wire."""
+
+    LEFT = 0
+    RIGHT = 1
+
+
+def move_position(x, y, direction, keys, height, vel=PLAYER_VELOCITY):
+    """
+    Apply one frame of movement to a position, keeping it inside the play area.
+
+    Args:
+        x (int): The x-coordinate of the player's top-left corner.
+        y (int): The y-coordinate of the player's top-left corner.
+        direction (Direction): The direction the player faces.
+        keys (int): The key-state bitmask.
+        height (int): The height of the player.
+        vel (int): The distance moved per frame.
+
+    Returns:
+        tuple: The new (x, y, direction).
+    """
+    if keys & KEY_LEFT and x > (PLAYER_LIMIT_LEFT + 2):
+        x -= vel
+        direction = Direction.LEFT
+    if keys & KEY_RIGHT and x < (PLAYER_LIMIT_RIGHT - height - 2):
+        x += vel
+        direction = Direction.RIGHT
+    if keys & KEY_UP and y > (PLAYER_LIMIT_TOP + 2):
+        y -= vel
+    if keys & KEY_DOWN and y < (PLAYER_LIMIT_DOWN - height - 2):
+        y += vel
+    return x, y, direction
+
+
+class PlayerState:
+    """
+    The state of one player, free of anything needed only to draw it.
+
+    This is what the server keeps per player, so it uses slots and does not
+    depend on pygame; the client's ``Player`` wraps one for rendering.
+    """
+
+    __slots__ = (
+        "id",
+        "name",
+        "x",
+        "y",
+        "width",
+        "height",
+        "score",
+        "direction",
+        "input_seq",
+        "character",
+        "color",
+    )
+
+    vel = PLAYER_VELOCITY
+
+    def __init__(self, player_id, x, y, width, height, character_color, color=None):
+        """
+        Initialize a PlayerState object.
+
+        Args:
+            player_id (str): The unique identifier for the player.
+            x (int): The x-coordinate of the player's top-left corner.
+            y (int): The y-coordinate of the player's top-left corner.
+            width (int): The width of the player.
+            height (int): The height of the player.
+            character_color (str): The name of the player's character.
+            color (tuple, optional): The player's RGB color; random if omitted.
+        """
+        self.id = player_id
+        self.name = f"guest_{str(player_id)[:4]}"
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.score = 0
+        self.direction = Direction.LEFT
+        self.input_seq = 0
+        self.character = character_color
+        self.color = color if color is not None else get_random_color()
+
+    @property
+    def center(self):
+        """The (x, y) center of the player."""
+        return self.x + self.width / 2, self.y + self.height / 2
+
+    def bounds(self):
+        """
+        Get the area the player covers.
+
+        Returns:
+            tuple: (left, top, right, bottom).
+        """
+        return self.x, self.y, self.x + self.width, self.y + self.height
+
+    def move(self, keys):
+        """
+        Move the player based on a key-state bitmask.
+
+        Args:
+            keys (int): The key-state bitmask.
+        """
+        self.x, self.y, self.direction = move_position(
+            self.x, self.y, self.direction, keys, self.height, self.vel
+        )
+
+    def update_score(self, multiplier=1):
+        """Update the player's score."""
+        self.score += 1 * multiplier
+
+    def get_player_details(self):
+        """
+        Get details of the player as a dictionary.
+
+        Returns:
+            dict: A dictionary containing the player's details.
+        """
+        return {
+            "id": self.id,
+            "name": self.name,
+            "score": self.score,
+            "navigation": {
+                "x": self.x,
+                "y": self.y,
+                "direction": self.direction.name.lower(),
+                "vel": self.vel,
+            },
+            "details": {
+                "width": self.width,
+                "height": self.height,
+                "character": self.character,
+                "color": self.color,
+            },
+        }
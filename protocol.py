@@ -0,0 +1,499 @@
+"""
+Binary wire protocol shared by the client and the server.
+
+Every message is a frame: a fixed header followed by a payload.
+
+    header:  length (uint32) | version (uint8) | type (uint8)
+    payload: ``length`` bytes, layout depends on the message type
+
+All fields are big-endian.
+
+With UDP enabled the TCP connection stays the reliable channel for the hello,
+redirects and the winner; inputs and snapshots may also travel as datagrams.
+A client datagram is a token, from the server's UDP offer, followed by input
+frames; a server datagram is one or more frames.
+"""
+import functools
+import struct
+import uuid
+from collections import namedtuple
+
+from game_config import CHARACTER_COLORS, BUFFER_SIZE
+from player_state import Direction
+from snapshot import Delta
+
+PROTOCOL_VERSION = 7
+MAX_FRAME_SIZE = 1 << 20
+# Snapshots larger than this go over TCP even to UDP clients, to avoid IP fragmentation
+MAX_DATAGRAM_SIZE = 1200
+
+# Message types
+MSG_HELLO = 1
+MSG_INPUT = 2
+MSG_SNAPSHOT = 3
+MSG_WINNER = 4
+MSG_REDIRECT = 5
+MSG_UDP_OFFER = 6
+
+CHARACTER_CODES = {character: code for code, character in enumerate(CHARACTER_COLORS)}
+
+HEADER = struct.Struct("!IBB")
+# id, x, y, width, height, character, r, g, b, server tick rate
+HELLO = struct.Struct("!16shhHHBBBBH")
+# ack, input seq, client timestamp, key-state bitmask
+INPUT = struct.Struct("!IIdB")
+# seq, base seq, last input seq applied for the receiver, multiplier, then
+# counts of: added players, updated players, removed players, added coins,
+# removed coins
+SNAPSHOT = struct.Struct("!IIIdHHHHH")
+# port of the room to reconnect to
+REDIRECT = struct.Struct("!H")
+# token identifying the player's datagrams; prefixes every client datagram too
+DATAGRAM_TOKEN = struct.Struct("!Q")
+# id, x, y, score, direction, character, r, g, b
+SNAPSHOT_PLAYER = struct.Struct("!16shhdBBBBB")
+# id, x, y, score, direction
+SNAPSHOT_PLAYER_UPDATE = struct.Struct("!16shhdB")
+# id
+SNAPSHOT_PLAYER_REMOVED = struct.Struct("!16s")
+# id, x, y, multiplier
+SNAPSHOT_COIN = struct.Struct("!Ihhf")
+# id
+SNAPSHOT_COIN_REMOVED = struct.Struct("!I")
+
+
+# counts of each Delta section, in SNAPSHOT order, and their packed records
+EncodedDelta = namedtuple("EncodedDelta", ["counts", "body"])
+
+
+class ProtocolError(Exception):
+    """Raised when a frame cannot be decoded."""
+
+
+@functools.lru_cache(maxsize=4096)
+def pack_id(player_id):
+    """Convert a player's uuid string to its 16-byte wire form."""
+    return uuid.UUID(player_id).bytes
+
+
+@functools.lru_cache(maxsize=4096)
+def unpack_id(data):
+    """Convert a 16-byte wire id back to the player's uuid string."""
+    return str(uuid.UUID(bytes=data))
+
+
+def frame(msg_type, payload):
+    """
+    Wrap a payload in a frame header.
+
+    Args:
+        msg_type (int): One of the MSG_* constants.
+        payload (bytes): The encoded message body.
+
+    Returns:
+        bytes: The complete frame.
+    """
+    return HEADER.pack(len(payload), PROTOCOL_VERSION, msg_type) + payload
+
+
+def parse_header(data, offset=0):
+    """
+    Parse and validate a frame header.
+
+    Returns:
+        tuple: (payload length, message type)
+    """
+    length, version, msg_type = HEADER.unpack_from(data, offset)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported protocol version {version}")
+    if length > MAX_FRAME_SIZE:
+        raise ProtocolError(f"Frame of {length} bytes exceeds {MAX_FRAME_SIZE}")
+    return length, msg_type
+
+
+def encode_hello(player, tick_rate):
+    """
+    Encode the details of a newly connected player.
+
+    Args:
+        player (PlayerState): The player the client controls.
+        tick_rate (int): Snapshots the server sends per second, from which the
+            client derives how far in the past to render opponents.
+    """
+    return frame(
+        MSG_HELLO,
+        HELLO.pack(
+            pack_id(player.id),
+            player.x,
+            player.y,
+            player.width,
+            player.height,
+            CHARACTER_CODES[player.character],
+            *player.color,
+            tick_rate,
+        ),
+    )
+
+
+def decode_hello(payload):
+    """
+    Decode a hello message.
+
+    Returns:
+        dict: The player's id, position, size, character and color, and the
+        server's tick rate.
+    """
+    try:
+        player_id, x, y, width, height, character, r, g, b, tick_rate = HELLO.unpack(payload)
+        if not tick_rate:
+            raise ProtocolError("Hello with a tick rate of 0")
+        return {
+            "id": unpack_id(player_id),
+            "x": x,
+            "y": y,
+            "width": width,
+            "height": height,
+            "character": CHARACTER_COLORS[character],
+            "color": (r, g, b),
+            "tick_rate": tick_rate,
+        }
+    except (struct.error, IndexError) as e:
+        raise ProtocolError(f"Malformed hello: {e}") from e
+
+
+def encode_input(ack, seq, timestamp, keys):
+    """
+    Encode a client's per-frame input.
+
+    Args:
+        ack (int): The sequence of the last snapshot the client applied, or 0.
+        seq (int): The sequence number of this input.
+        timestamp (float): The client's clock when the input was sampled.
+        keys (int): The key-state bitmask.
+    """
+    return frame(MSG_INPUT, INPUT.pack(ack, seq, timestamp, keys))
+
+
+def decode_input(payload):
+    """
+    Decode a client's per-frame input.
+
+    Returns:
+        tuple: (ack, seq, timestamp, keys)
+    """
+    try:
+        return INPUT.unpack(payload)
+    except struct.error as e:
+        raise ProtocolError(f"Malformed input: {e}") from e
+
+
+def encode_delta(delta):
+    """
+    Encode the records of a delta, which every client on the same base shares.
+
+    Args:
+        delta (Delta): The changes from the base state.
+
+    Returns:
+        EncodedDelta: The section counts and the packed records.
+    """
+    parts = []
+    pack = SNAPSHOT_PLAYER.pack
+    parts.extend(
+        pack(
+            pack_id(player_id),
+            x,
+            y,
+            score,
+            direction,
+            CHARACTER_CODES[character],
+            *color,
+        )
+        for player_id, x, y, score, direction, character, color in delta.added_players
+    )
+    pack = SNAPSHOT_PLAYER_UPDATE.pack
+    parts.extend(
+        pack(pack_id(player_id), x, y, score, direction)
+        for player_id, x, y, score, direction in delta.updated_players
+    )
+    pack = SNAPSHOT_PLAYER_REMOVED.pack
+    parts.extend(pack(pack_id(player_id)) for player_id in delta.removed_players)
+    pack = SNAPSHOT_COIN.pack
+    parts.extend(pack(*coin) for coin in delta.added_coins)
+    pack = SNAPSHOT_COIN_REMOVED.pack
+    parts.extend(pack(coin_id) for coin_id in delta.removed_coins)
+    return EncodedDelta(tuple(len(section) for section in delta), memoryview(b"".join(parts)))
+
+
+def encode_snapshot_header(seq, base_seq, input_seq, multiplier, encoded):
+    """
+    Encode the part of a snapshot frame specific to its receiver.
+
+    The frame is this header followed by ``encoded.body``.
+
+    Args:
+        seq (int): The sequence number of this snapshot.
+        base_seq (int): The snapshot the delta applies to, or 0 for a keyframe.
+        input_seq (int): The last input of the receiving client applied to this state.
+        multiplier (float): The multiplier of the coin the client grabbed, or 0.
+        encoded (EncodedDelta): The shared records, from ``encode_delta``.
+
+    Returns:
+        bytes: The frame header and snapshot header.
+    """
+    return HEADER.pack(
+        SNAPSHOT.size + len(encoded.body), PROTOCOL_VERSION, MSG_SNAPSHOT
+    ) + SNAPSHOT.pack(seq, base_seq, input_seq, multiplier, *encoded.counts)
+
+
+def encode_snapshot(seq, base_seq, input_seq, multiplier, delta):
+    """
+    Encode a snapshot as a delta against a state the client acknowledged.
+
+    Args:
+        seq (int): The sequence number of this snapshot.
+        base_seq (int): The snapshot the delta applies to, or 0 for a keyframe.
+        input_seq (int): The last input of the receiving client applied to this state.
+        multiplier (float): The multiplier of the coin the client grabbed, or 0.
+        delta (Delta): The changes from the base state.
+
+    Returns:
+        bytes: The snapshot frame.
+    """
+    encoded = encode_delta(delta)
+    return encode_snapshot_header(seq, base_seq, input_seq, multiplier, encoded) + encoded.body
+
+
+def decode_snapshot(payload):
+    """
+    Decode a snapshot message.
+
+    Returns:
+        tuple: (seq, base seq, input seq, multiplier, Delta)
+    """
+    try:
+        seq, base_seq, input_seq, multiplier, *counts = SNAPSHOT.unpack_from(payload)
+    except struct.error as e:
+        raise ProtocolError(f"Malformed snapshot: {e}") from e
+    sections = (
+        SNAPSHOT_PLAYER,
+        SNAPSHOT_PLAYER_UPDATE,
+        SNAPSHOT_PLAYER_REMOVED,
+        SNAPSHOT_COIN,
+        SNAPSHOT_COIN_REMOVED,
+    )
+    expected = SNAPSHOT.size + sum(c * record.size for c, record in zip(counts, sections))
+    if len(payload) != expected:
+        raise ProtocolError(f"Snapshot of {len(payload)} bytes, expected {expected}")
+
+    view = memoryview(payload)
+    offset = SNAPSHOT.size
+    records = []
+    for count, record in zip(counts, sections):
+        end = offset + count * record.size
+        records.append(record.iter_unpack(view[offset:end]))
+        offset = end
+    added_players, updated_players, removed_players, added_coins, removed_coins = records
+
+    try:
+        delta = Delta(
+            [
+                (
+                    unpack_id(player_id),
+                    x,
+                    y,
+                    score,
+                    Direction(direction),
+                    CHARACTER_COLORS[character],
+                    (r, g, b),
+                )
+                for player_id, x, y, score, direction, character, r, g, b in added_players
+            ],
+            [
+                (unpack_id(player_id), x, y, score, Direction(direction))
+                for player_id, x, y, score, direction in updated_players
+            ],
+            [unpack_id(player_id) for (player_id,) in removed_players],
+            list(added_coins),
+            [coin_id for (coin_id,) in removed_coins],
+        )
+    except (ValueError, IndexError) as e:
+        raise ProtocolError(f"Malformed snapshot: {e}") from e
+    return seq, base_seq, input_seq, multiplier, delta
+
+
+def encode_winner(name):
+    """Encode the announcement of the winning player's name."""
+    return frame(MSG_WINNER, name.encode("utf-8"))
+
+
+def decode_winner(payload):
+    """Decode the winning player's name."""
+    try:
+        return bytes(payload).decode("utf-8")
+    except UnicodeDecodeError as e:
+        raise ProtocolError(f"Malformed winner: {e}") from e
+
+
+def encode_redirect(port):
+    """Encode the lobby's answer: the port of the room the client should join."""
+    return frame(MSG_REDIRECT, REDIRECT.pack(port))
+
+
+def decode_redirect(payload):
+    """Decode a redirect into the port to reconnect to."""
+    try:
+        return REDIRECT.unpack(payload)[0]
+    except struct.error as e:
+        raise ProtocolError(f"Malformed redirect: {e}") from e
+
+
+def encode_udp_offer(token):
+    """Encode the server's offer to exchange inputs and snapshots over UDP."""
+    return frame(MSG_UDP_OFFER, DATAGRAM_TOKEN.pack(token))
+
+
+def decode_udp_offer(payload):
+    """Decode a UDP offer into the token the client must send its datagrams with."""
+    try:
+        return DATAGRAM_TOKEN.unpack(payload)[0]
+    except struct.error as e:
+        raise ProtocolError(f"Malformed UDP offer: {e}") from e
+
+
+def encode_datagram(token, frames):
+    """Prefix encoded frames with the sender's token to form a client datagram."""
+    return DATAGRAM_TOKEN.pack(token) + frames
+
+
+def decode_datagram(data):
+    """
+    Split a client datagram.
+
+    Returns:
+        tuple: (token, the frames that follow it)
+    """
+    if len(data) < DATAGRAM_TOKEN.size:
+        raise ProtocolError("Datagram too short")
+    return DATAGRAM_TOKEN.unpack_from(data)[0], memoryview(data)[DATAGRAM_TOKEN.size :]
+
+
+def iter_frames(data):
+    """
+    Yield the frames packed back to back in a datagram.
+
+    Args:
+        data (bytes-like): Whole frames, as sent in one datagram.
+
+    Yields:
+        tuple: (message type, payload bytes)
+    """
+    offset = 0
+    while offset < len(data):
+        if len(data) - offset < HEADER.size:
+            raise ProtocolError("Truncated frame header in datagram")
+        length, msg_type = parse_header(data, offset)
+        start = offset + HEADER.size
+        offset = start + length
+        if offset > len(data):
+            raise ProtocolError("Truncated frame in datagram")
+        yield msg_type, bytes(data[start:offset])
+
+
+class FrameReader:
+    """
+    Reassemble frames from a byte stream using one reusable receive buffer.
+
+    Bytes are received straight into the buffer with ``recv_into``; consumed
+    frames are compacted away and the buffer only grows when a single frame
+    does not fit.
+    """
+
+    def __init__(self, size=BUFFER_SIZE):
+        self.buffer = bytearray(size)
+        self.start = 0
+        self.end = 0
+        self.received = 0
+
+    def reserve(self, size):
+        """Make room for at least ``size`` unread bytes in the buffer."""
+        if len(self.buffer) - self.start >= size:
+            return
+        pending = self.end - self.start
+        if size > len(self.buffer):
+            buffer = bytearray(max(size, 2 * len(self.buffer)))
+            buffer[:pending] = self.buffer[self.start : self.end]
+            self.buffer = buffer
+        else:
+            self.buffer[:pending] = self.buffer[self.start : self.end]
+        self.start, self.end = 0, pending
+
+    def recv_from(self, sock):
+        """
+        Receive available bytes from a socket into the buffer.
+
+        Returns:
+            int: The number of bytes received, 0 if the peer closed the connection.
+        """
+        if self.end == len(self.buffer):
+            self.reserve(self.end - self.start + 1)
+        received = sock.recv_into(memoryview(self.buffer)[self.end :])
+        self.end += received
+        self.received += received
+        return received
+
+    def next_frame(self):
+        """
+        Pop the next complete frame from the buffer.
+
+        Returns:
+            tuple or None: (message type, payload bytes), or None if no complete
+            frame has been received yet.
+        """
+        pending = self.end - self.start
+        if pending < HEADER.size:
+            return None
+        length, msg_type = parse_header(self.buffer, self.start)
+        frame_size = HEADER.size + length
+        if pending < frame_size:
+            self.reserve(frame_size)
+            return None
+        payload_start = self.start + HEADER.size
+        payload = bytes(self.buffer[payload_start : payload_start + length])
+        self.start += frame_size
+        if self.start == self.end:
+            self.start = self.end = 0
+        return msg_type, payload
+
+
+def read_frame(sock, reader):
+    """
+    Block until one complete frame has been read from a socket.
+
+    Args:
+        sock (socket.socket): The socket to read from.
+        reader (FrameReader): The connection's frame reader.
+
+    Returns:
+        tuple: (message type, payload bytes)
+    """
+    while True:
+        message = reader.next_frame()
+        if message is not None:
+            return message
+        if not reader.recv_from(sock):
+            raise ConnectionError("Connection closed by peer")
+
+
+async def read_frame_async(stream):
+    """
+    Read one complete frame from an asyncio stream.
+
+    Args:
+        stream (asyncio.StreamReader): The stream to read from.
+
+    Returns:
+        tuple: (message type, payload bytes)
+    """
+    length, msg_type = parse_header(await stream.readexactly(HEADER.size))
+    return msg_type, await stream.readexactly(length)
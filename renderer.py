@@ -0,0 +1,166 @@
+import pygame
+
+
+def merge_rects(rects):
+    """
+    Merge overlapping rectangles so every pixel is covered at most once.
+
+    Args:
+        rects (iterable): The pygame.Rect regions to merge.
+
+    Returns:
+        list: Non-overlapping pygame.Rect regions covering the input.
+    """
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+class LayerCache:
+    """
+    Static layers rendered once into off-screen surfaces.
+
+    A layer is drawn again only when the window size or the theme it was
+    drawn for changes; otherwise the same surface is handed back.
+    """
+
+    def __init__(self):
+        self.layers = {}
+
+    def get(self, name, size, theme, draw):
+        """
+        Return a layer, rendering it if it is missing or stale.
+
+        Args:
+            name (str): Identifies the layer.
+            size (tuple): The (width, height) of the layer.
+            theme (Theme): The colors the layer is drawn with.
+            draw (callable): ``draw(surface, theme)`` paints the layer.
+
+        Returns:
+            pygame.Surface: The rendered layer.
+        """
+        key = (tuple(size), theme)
+        entry = self.layers.get(name)
+        if entry is None or entry[0] != key:
+            surface = pygame.Surface(size).convert()
+            draw(surface, theme)
+            entry = self.layers[name] = (key, surface)
+        return entry[1]
+
+    def clear(self):
+        """Drop every layer so it is rendered again on next use."""
+        self.layers.clear()
+
+
+class DirtyRenderer:
+    """
+    Redraws only the parts of the window that changed since the last frame.
+
+    The window is composited from a static background layer with dynamic
+    items and panels on top. Each frame the caller describes everything that
+    should be in the area as a mapping of key -> (rect, look, draw). An item
+    is dirty when it appears, disappears, moves or changes its look; its old
+    and new rects are restored from the background and every item overlapping
+    them is drawn again, clipped to the restored region. The returned rects
+    are what changed on screen, ready for ``pygame.display.update``.
+
+    Panels are regions outside the area, such as the scoreboard, that are
+    redrawn whole over the background but only when their look changes.
+    """
+
+    def __init__(self, win, area, background):
+        """
+        Initialize a renderer that starts with the whole window dirty.
+
+        Args:
+            win (pygame.Surface): The window surface to draw on.
+            area (pygame.Rect): The region the items live in.
+            background (pygame.Surface): The static layer behind everything,
+                the same size as ``win``.
+        """
+        self.win = win
+        self.area = pygame.Rect(area)
+        self.background = background
+        self.items = {}
+        self.panels = {}
+        self.full = True
+
+    def invalidate(self):
+        """Repaint the whole window on the next frame."""
+        self.full = True
+        self.panels.clear()
+
+    def set_background(self, background):
+        """Switch to a new background layer, repainting if it changed."""
+        if background is not self.background:
+            self.background = background
+            self.invalidate()
+
+    def render(self, items):
+        """
+        Bring the area up to date with this frame's items.
+
+        Args:
+            items (dict): Mapping of key to (rect, look, draw), where ``rect``
+                bounds everything ``draw(win)`` paints and ``look`` is any
+                comparable value that changes when the item's appearance does.
+                Items are drawn in insertion order.
+
+        Returns:
+            list: The pygame.Rect regions that were redrawn.
+        """
+        previous, self.items = self.items, items
+        repainted = []
+        if self.full:
+            self.full = False
+            self.win.blit(self.background, (0, 0))
+            repainted.append(self.win.get_rect())
+            changed = [self.area]
+        else:
+            changed = []
+            for key, (rect, look, _) in items.items():
+                old = previous.get(key)
+                if old is None:
+                    changed.append(rect)
+                elif old[0] != rect or old[1] != look:
+                    changed.append(old[0])
+                    changed.append(rect)
+            changed.extend(old[0] for key, old in previous.items() if key not in items)
+
+        dirty = merge_rects(rect.clip(self.area) for rect in changed)
+        dirty = [rect for rect in dirty if rect.width and rect.height]
+        for rect in dirty:
+            self.win.set_clip(rect)
+            self.win.blit(self.background, rect, rect)
+            for item_rect, _, draw in items.values():
+                if item_rect.colliderect(rect):
+                    draw(self.win)
+        self.win.set_clip(None)
+        return repainted or dirty
+
+    def render_panel(self, key, rect, look, draw):
+        """
+        Redraw a panel over the background if its look changed since it was last drawn.
+
+        Args:
+            key (hashable): Identifies the panel.
+            rect (pygame.Rect): The region ``draw(win)`` paints.
+            look (object): A comparable value describing the panel's content.
+            draw (callable): Paints the panel onto the window.
+
+        Returns:
+            list: ``[rect]`` if the panel was redrawn, otherwise empty.
+        """
+        if key in self.panels and self.panels[key] == look:
+            return []
+        self.panels[key] = look
+        self.win.blit(self.background, rect, rect)
+        draw(self.win)
+        return [pygame.Rect(rect)]
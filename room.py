@@ -0,0 +1,615 @@
+import queue
+import random
+import secrets
+import time
+from collections import namedtuple
+from player_state import PlayerState
+from protocol import (
+    MAX_DATAGRAM_SIZE,
+    encode_delta,
+    encode_hello,
+    encode_snapshot_header,
+    encode_udp_offer,
+    encode_winner,
+)
+from snapshot import SnapshotHistory, capture_state, diff_states
+from spatial import CoinGrid
+from collision import np, resolve_pickups
+from coins import CoinPool
+from outbox import buffers_size
+from game_config import (
+    get_random_pos,
+    get_random_character,
+    generate_coin,
+    PLAYER_WIDTH,
+    PLAYER_HEIGHT,
+    COIN_RADIUS,
+    MAX_COINS,
+    MIN_GENERATE_INTERVAL,
+    MAX_GENERATE_INTERVAL,
+    WINNING_POINTS,
+    ROOM_RECYCLE_DELAY,
+    TICK_RATE,
+)
+
+# Commands a room's owner applies in the order they were submitted.
+# writer: the player's asyncio.StreamWriter, or None in threaded mode
+Join = namedtuple("Join", ["player_id", "outbox", "disconnect", "writer"], defaults=[None])
+Leave = namedtuple("Leave", ["player_id"])
+# addr: where a UDP input came from, or None for one read from TCP
+Input = namedtuple("Input", ["player_id", "ack", "input_seq", "keys", "addr"], defaults=[None])
+Spawn = namedtuple("Spawn", [])
+Recycle = namedtuple("Recycle", [])
+
+
+def new_player(player_id):
+    """Create a player at a random position with a random character."""
+    return PlayerState(
+        player_id,
+        *get_random_pos(),
+        PLAYER_WIDTH,
+        PLAYER_HEIGHT,
+        get_random_character(),
+    )
+
+
+class Room:
+    """
+    One match: its players, coins and winner.
+
+    A room is open until a player reaches WINNING_POINTS. It then keeps
+    announcing the winner for ROOM_RECYCLE_DELAY seconds, disconnects whoever
+    is left and starts over as a fresh, open match.
+
+    Only the room's owner changes its state. Connection handlers and timers
+    ``submit`` commands, which the owner applies in order: in asyncio mode
+    ``run_tick`` applies whatever is queued and advances the room once per
+    tick, and in threaded mode a thread of its own runs ``serve``, answering
+    inputs as soon as they arrive. Timers run on the scheduler the room was
+    given and only submit commands.
+
+    In asyncio mode the room may also have a ``datagram`` transport. Clients
+    that accept its UDP offer get their snapshots as datagrams, while the
+    winner is still announced over their TCP connection.
+    """
+
+    def __init__(self, room_id, scheduler, metrics, listener=None, tick_rate=TICK_RATE):
+        """
+        Initialize an empty room; call ``start`` to begin spawning coins.
+
+        Args:
+            room_id (int): Identifies the room.
+            scheduler (Scheduler): Runs coin spawns and the recycle timer.
+            metrics (Metrics): Receives the room's timings.
+            listener (callable, optional): Called with the room whenever its
+                player count or open state changes.
+            tick_rate (int): Ticks per second of the loop running the room,
+                told to clients in the hello.
+        """
+        self.id = room_id
+        self.tick_rate = tick_rate
+        self.scheduler = scheduler
+        self.metrics = metrics
+        self.listener = listener
+        self.commands = queue.SimpleQueue()
+        self.coins = CoinPool()
+        self.players = {}
+        self.disconnects = {}
+        self.datagram = None
+        self.tick = 0
+        self.reset()
+
+    def reset(self):
+        """Clear the match state."""
+        self.winner_found = False
+        self.winner_frame = None
+        self.coins.clear()
+        self.coin_grid = CoinGrid()
+        self.spawn_timer = None
+        self.history = SnapshotHistory()
+        self.pending_inputs = {}
+        self.acks = {}
+        self.writers = {}
+        self.outboxes = {}
+        self.histories = {}
+        self.tokens = {}
+        self.datagram_addrs = {}
+        self.announced = set()
+
+    def start(self):
+        """Begin spawning coins."""
+        self.schedule_coin_spawn()
+
+    def is_open(self):
+        """Whether the match is still being played."""
+        return not self.winner_found
+
+    def notify(self):
+        if self.listener is not None:
+            self.listener(self)
+
+    def submit(self, command):
+        """Queue a command for the room's owner; safe from any thread."""
+        self.commands.put(command)
+
+    def apply_commands(self, limit=None, command=None):
+        """
+        Apply ``command``, if given, and then every queued command, in order.
+
+        Inputs are only queued here, to be applied by ``run_tick`` or ``respond``.
+
+        Args:
+            limit (int, optional): The most inputs kept per player until then.
+            command (tuple, optional): A command already taken from the queue.
+        """
+        while True:
+            if command is not None:
+                self.apply(command, limit)
+            try:
+                command = self.commands.get_nowait()
+            except queue.Empty:
+                return
+
+    def apply(self, command, limit=None):
+        """Apply one command."""
+        kind = type(command)
+        if kind is Input:
+            if command.addr is not None and command.player_id in self.players:
+                self.datagram_addrs[command.player_id] = command.addr
+            new = self.queue_input(
+                command.player_id, command.ack, command.input_seq, command.keys, limit
+            )
+            if new and command.addr is None:
+                # a client that gave up on UDP sends new inputs over TCP only
+                self.datagram_addrs.pop(command.player_id, None)
+        elif kind is Join:
+            self.join(*command)
+        elif kind is Leave:
+            self.leave(command.player_id)
+        elif kind is Spawn:
+            self.spawn_coin()
+        elif kind is Recycle:
+            self.recycle()
+
+    def serve(self):
+        """Own the room in threaded mode: apply commands and answer inputs as they arrive."""
+        while True:
+            self.apply_commands(command=self.commands.get())
+            self.respond()
+
+    def join(self, player_id, outbox, disconnect, writer=None):
+        """
+        Add a new player to the room and queue their hello.
+
+        Args:
+            player_id (str): The unique identifier for the player.
+            outbox (Outbox): The player's outbound queue.
+            disconnect (callable): Closes the player's connection when the room
+                is recycled or they fall too far behind.
+            writer (asyncio.StreamWriter, optional): In asyncio mode, the
+                connection the tick sends the player a snapshot on every tick.
+
+        Returns:
+            PlayerState: The new player.
+        """
+        player = self.players[player_id] = new_player(player_id)
+        self.disconnects[player_id] = disconnect
+        self.outboxes[player_id] = outbox
+        outbox.put(encode_hello(player, self.tick_rate))
+        if self.datagram is not None:
+            outbox.put(encode_udp_offer(self.offer_datagrams(player_id)))
+        if writer is not None:
+            self.acks[player_id] = 0
+            self.writers[player_id] = writer
+        self.notify()
+        return player
+
+    def leave(self, player_id):
+        """
+        Remove a player and everything queued for them.
+
+        Their connection's byte counts are dropped here rather than by the
+        connection handler: until this runs, their UDP token is still valid
+        and datagrams in flight are still counted against them.
+        """
+        self.metrics.drop_connection(player_id)
+        self.writers.pop(player_id, None)
+        self.outboxes.pop(player_id, None)
+        self.histories.pop(player_id, None)
+        self.pending_inputs.pop(player_id, None)
+        self.acks.pop(player_id, None)
+        self.disconnects.pop(player_id, None)
+        self.announced.discard(player_id)
+        self.datagram_addrs.pop(player_id, None)
+        if self.tokens:
+            self.tokens = {token: p_id for token, p_id in self.tokens.items() if p_id != player_id}
+        if self.players.pop(player_id, None) is not None:
+            self.notify()
+
+    def recycle(self):
+        """Disconnect the players still in the finished match and open a fresh one."""
+        disconnects = list(self.disconnects.values())
+        self.players.clear()
+        self.disconnects.clear()
+        self.reset()
+        for disconnect in disconnects:
+            disconnect()
+        self.start()
+        self.notify()
+
+    def update_score(self, player, score):
+        """
+        Set a player's score and end the match once it reaches WINNING_POINTS.
+
+        Args:
+            player (PlayerState): The player whose score changed.
+            score (float): The new score.
+        """
+        player.score = score
+        if score < WINNING_POINTS or self.winner_found:
+            return
+        self.winner_found = True
+        self.winner_frame = encode_winner(player.name)
+        if self.spawn_timer is not None:
+            self.spawn_timer.cancel()
+        self.scheduler.call_later(ROOM_RECYCLE_DELAY, self.submit, Recycle())
+        self.notify()
+
+    def schedule_coin_spawn(self):
+        """
+        Schedule the next coin spawn after a random interval.
+
+        Does nothing if a spawn is already pending, the field already holds
+        MAX_COINS coins or the match is over.
+        """
+        if self.spawn_timer is None and not self.winner_found and len(self.coins) < MAX_COINS:
+            self.spawn_timer = self.scheduler.call_later(
+                random.randint(MIN_GENERATE_INTERVAL, MAX_GENERATE_INTERVAL), self.submit, Spawn()
+            )
+
+    def spawn_coin(self):
+        """Add a coin to the field and schedule the next spawn."""
+        self.spawn_timer = None
+        if not self.winner_found and len(self.coins) < MAX_COINS:
+            self.add_coin(generate_coin())
+        self.schedule_coin_spawn()
+
+    def add_coin(self, coin):
+        """
+        Add a coin to the coin pool, which gives it its id, and index it in coin_grid.
+
+        Args:
+            coin (tuple): The coin ((x, y), multiplier).
+        """
+        center, multiplier = coin
+        coin_id = self.coins.add(center, multiplier)
+        self.coin_grid.insert(coin_id, center, COIN_RADIUS * multiplier)
+
+    def remove_coin(self, coin_id):
+        """Remove a coin from coins and coin_grid, making room for a new spawn."""
+        self.coins.remove(coin_id)
+        self.coin_grid.remove(coin_id)
+        self.schedule_coin_spawn()
+
+    def touching_coins(self, player):
+        """
+        Find the coins whose circle touches the player.
+
+        Only the coins in the grid cells overlapping the player's bounds are tested.
+
+        Args:
+            player (PlayerState): The player object.
+
+        Returns:
+            list: (coin id, multiplier, squared distance) of each touching coin,
+            in id order.
+        """
+        player_x, player_y = player.center
+        player_radius = player.width / 2
+        touching = []
+        for coin_id in sorted(self.coin_grid.query(*player.bounds())):
+            (coin_x, coin_y), coin_multiplier = self.coins[coin_id]
+            coin_radius = COIN_RADIUS * coin_multiplier
+
+            # Compare the squared distance with the squared sum of radii
+            dx = coin_x - player_x
+            dy = coin_y - player_y
+            distance_squared = dx * dx + dy * dy
+            if distance_squared <= (player_radius + coin_radius) ** 2:
+                touching.append((coin_id, coin_multiplier, distance_squared))
+        return touching
+
+    def claim_coins_grid(self, players):
+        """
+        Assign touched coins to players by querying coin_grid per player.
+
+        Args:
+            players (dict): Mapping of player id to PlayerState.
+
+        Returns:
+            dict: Mapping of coin id to the id of the player who gets it.
+        """
+        claims = {}
+        for player_id, player in players.items():
+            for coin_id, _, distance_squared in self.touching_coins(player):
+                claim = (distance_squared, player_id)
+                if claims.get(coin_id, claim) >= claim:
+                    claims[coin_id] = claim
+        return {coin_id: player_id for coin_id, (_, player_id) in claims.items()}
+
+    def claim_coins_batch(self, players):
+        """
+        Assign touched coins to players with one vectorized pass over all coins.
+
+        Runs over every slot of the coin pool's columns as they are; free
+        slots have a NaN multiplier, so they are never touched.
+
+        Args:
+            players (dict): Mapping of player id to PlayerState.
+
+        Returns:
+            dict: Mapping of coin id to the id of the player who gets it.
+        """
+        player_ids = sorted(players)
+        player_centers = np.array(
+            [players[p_id].center for p_id in player_ids], dtype=float
+        ).reshape(-1, 2)
+        player_radii = np.array([players[p_id].width / 2 for p_id in player_ids], dtype=float)
+
+        pool = self.coins
+        slots, player_indices = resolve_pickups(
+            player_centers, player_radii, pool.centers, COIN_RADIUS * pool.multiplier
+        )
+        return {
+            pool.coin_id(slot): player_ids[player_index]
+            for slot, player_index in zip(slots.tolist(), player_indices.tolist())
+        }
+
+    def grab_coins(self, players):
+        """
+        Resolve every coin pickup of a tick in one pass.
+
+        A coin touched by several players goes to the closest of them, and exact
+        ties go to the lowest player id, so the outcome does not depend on the
+        order inputs arrived in. Uses a vectorized pass when numpy is available
+        and coin_grid queries otherwise.
+
+        Args:
+            players (dict): Mapping of player id to PlayerState.
+
+        Returns:
+            dict: Mapping of player id to the multiplier of the coin they grabbed.
+        """
+        start = time.perf_counter()
+        multipliers = {}
+        if players and self.coins:
+            if np is not None:
+                claims = self.claim_coins_batch(players)
+            else:
+                claims = self.claim_coins_grid(players)
+            for coin_id in sorted(claims):
+                multipliers[claims[coin_id]] = self.coins[coin_id][1]
+                self.remove_coin(coin_id)
+        self.metrics.observe("grab_coins", time.perf_counter() - start)
+        return multipliers
+
+    def award_coin(self, player, multiplier):
+        """Add a grabbed coin's value to the player's score."""
+        if multiplier:
+            self.update_score(player, player.score + multiplier)
+
+    def build_reply(self, history, seq, ack, input_seq, multiplier, encoded=None):
+        """
+        Encode the frames sent to a player after their input was applied.
+
+        The snapshot is a delta against the last state the player acknowledged,
+        or a keyframe if they have not acknowledged one that is still in
+        ``history``. Only its header is specific to the player: the delta's
+        records are encoded once per base and shared through ``encoded``.
+
+        Args:
+            history (SnapshotHistory): States already sent, including ``seq``.
+            seq (int): The sequence of the snapshot being sent.
+            ack (int): The last snapshot the player acknowledged, or 0.
+            input_seq (int): The player's last input applied to the snapshot.
+            multiplier (float): The multiplier of the coin they grabbed, or 0.
+            encoded (dict, optional): Base seq -> EncodedDelta for snapshot
+                ``seq``, filled in as bases are first seen.
+
+        Returns:
+            list: The buffers to send in order: a winner frame once there is a
+            winner, then the snapshot header and the shared records.
+        """
+        start = time.perf_counter()
+        base = history.get(ack) if ack else None
+        base_seq = ack if base else 0
+        if encoded is None:
+            encoded = {}
+        records = encoded.get(base_seq)
+        if records is None:
+            records = encoded[base_seq] = encode_delta(diff_states(base, history.get(seq)))
+            self.metrics.count("snapshot_encodes")
+        reply = [encode_snapshot_header(seq, base_seq, input_seq, multiplier, records), records.body]
+        if self.winner_frame:
+            reply.insert(0, self.winner_frame)
+        self.metrics.observe("serialize", time.perf_counter() - start)
+        return reply
+
+    def offer_datagrams(self, player_id):
+        """
+        Issue the token a player's datagrams must carry.
+
+        Returns:
+            int: A random 64-bit token.
+        """
+        token = secrets.randbits(64)
+        self.tokens[token] = player_id
+        return token
+
+    def datagram_player(self, token):
+        """
+        Match a datagram's token to its player.
+
+        Returns:
+            str or None: The player's id, or None for an unknown token.
+        """
+        return self.tokens.get(token)
+
+    def queue_input(self, player_id, ack, input_seq, keys, limit):
+        """
+        Queue an input to be applied on the next tick.
+
+        Args:
+            player_id (str): The player who sent it.
+            ack (int): The last snapshot they acknowledged.
+            input_seq (int): The input's sequence number.
+            keys (int): The key-state bitmask.
+            limit (int or None): The most inputs kept per player per tick.
+
+        Returns:
+            bool: Whether the input was newer than any seen from the player.
+        """
+        player = self.players.get(player_id)
+        if player is None:
+            return False
+        queued = self.pending_inputs.setdefault(player_id, [])
+        if input_seq <= (queued[-1][0] if queued else player.input_seq):
+            # A repeat or a datagram that arrived out of order; its ack is stale too
+            return False
+        self.acks[player_id] = ack
+        if limit is None or len(queued) < limit:
+            queued.append((input_seq, keys))
+        return True
+
+    def apply_inputs(self):
+        """
+        Apply every queued input in order and resolve all coin pickups in one pass.
+
+        Returns:
+            tuple: The ids of the players who sent input, and a mapping of
+            player id to the multiplier of the coin they grabbed.
+        """
+        inputs, self.pending_inputs = self.pending_inputs, {}
+        for player_id, queued in inputs.items():
+            for input_seq, keys in queued:
+                apply_input(self.players[player_id], input_seq, keys)
+        multipliers = self.grab_coins({player_id: self.players[player_id] for player_id in inputs})
+        for player_id, multiplier in multipliers.items():
+            self.award_coin(self.players[player_id], multiplier)
+        return list(inputs), multipliers
+
+    def respond(self):
+        """
+        Apply the queued inputs and answer each player who sent one (threaded mode).
+
+        Inputs that arrived together are applied as one batch and answered
+        from one capture of the world. Each player keeps a history of the
+        states sent to them, under the room's running sequence number.
+        """
+        if not self.pending_inputs:
+            return
+        start = time.perf_counter()
+        player_ids, multipliers = self.apply_inputs()
+        self.tick += 1
+        state = capture_state(self.players.values(), self.coins)
+        for player_id in player_ids:
+            history = self.histories.get(player_id)
+            if history is None:
+                history = self.histories[player_id] = SnapshotHistory()
+            history.record(self.tick, state)
+            reply = self.build_reply(
+                history,
+                self.tick,
+                self.acks[player_id],
+                self.players[player_id].input_seq,
+                multipliers.get(player_id, 0),
+            )
+            if not self.outboxes[player_id].put_snapshot(reply):
+                print("Disconnecting slow client:", player_id)
+                self.disconnects[player_id]()
+        self.metrics.observe("respond", time.perf_counter() - start)
+
+    def run_tick(self, limit=None):
+        """
+        Advance the room by one tick (asyncio mode).
+
+        Applies the queued commands, then every queued input in order,
+        resolves all coin pickups in one pass and sends a snapshot to every
+        client. The world is captured once and each distinct delta encoded
+        once, however many clients receive it.
+
+        Args:
+            limit (int, optional): The most inputs applied per player.
+        """
+        start = time.perf_counter()
+        self.apply_commands(limit)
+        _, multipliers = self.apply_inputs()
+
+        self.tick += 1
+        self.history.record(self.tick, capture_state(self.players.values(), self.coins))
+        # Clients that acked the same snapshot share one encoded delta
+        encoded = {}
+        for player_id, writer in self.writers.items():
+            reply = self.build_reply(
+                self.history,
+                self.tick,
+                self.acks[player_id],
+                self.players[player_id].input_seq,
+                multipliers.get(player_id, 0),
+                encoded,
+            )
+            self.send(player_id, writer, reply)
+        self.metrics.observe("tick", time.perf_counter() - start)
+
+    def send(self, player_id, writer, reply):
+        """
+        Send a tick's reply by datagram if the player uses UDP and it fits, else over TCP.
+
+        Over TCP the reply goes through the player's outbox: while the
+        transport holds more than the outbox's limit, newer replies replace
+        the waiting one, and a player who stays that far behind is
+        disconnected. A player on UDP gets the winner once over TCP as well,
+        since datagrams may be lost.
+
+        Args:
+            player_id (str): The receiving player.
+            writer (asyncio.StreamWriter): Their TCP connection.
+            reply (list): The buffers from ``build_reply``.
+        """
+        if writer.is_closing():
+            return
+        outbox = self.outboxes[player_id]
+        size = buffers_size(reply)
+        addr = self.datagram_addrs.get(player_id)
+        if addr is not None and size <= MAX_DATAGRAM_SIZE:
+            self.datagram.sendto(b"".join(reply), addr)
+            self.metrics.transfer(player_id, sent=size)
+            if self.winner_frame and player_id not in self.announced:
+                self.announced.add(player_id)
+                outbox.put(self.winner_frame)
+        elif not outbox.put_snapshot(reply):
+            print("Disconnecting slow client:", player_id)
+            writer.transport.abort()
+            return
+        buffers = outbox.take_nowait(writer.transport.get_write_buffer_size())
+        if buffers:
+            # handed to the transport together, without joining them first
+            writer.writelines(buffers)
+            self.metrics.transfer(player_id, sent=buffers_size(buffers))
+
+
+def apply_input(player, seq, keys):
+    """
+    Move a player according to one of their inputs.
+
+    Inputs that are not newer than the last one applied are ignored.
+
+    Args:
+        player (PlayerState): The server's copy of the player.
+        seq (int): The input's sequence number.
+        keys (int): The key-state bitmask.
+    """
+    if seq <= player.input_seq:
+        return
+    player.input_seq = seq
+    player.move(keys)
@@ -0,0 +1,90 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class Timer:
+    """A handle to a scheduled callback, used to cancel it."""
+
+    def __init__(self, when, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """Prevent the callback from running."""
+        self.cancelled = True
+
+
+class Scheduler:
+    """
+    A heap-based timer queue.
+
+    Callbacks run at their due time, either from ``run_pending`` (called by an
+    existing loop such as the game tick) or from ``run_forever`` on a
+    dedicated thread that sleeps until the next timer is due. Timers may be
+    scheduled from any thread.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        """
+        Initialize an empty scheduler.
+
+        Args:
+            clock (callable): Returns the current time in seconds.
+        """
+        self.clock = clock
+        self.heap = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.running = False
+
+    def call_later(self, delay, callback, *args):
+        """
+        Schedule ``callback(*args)`` to run after ``delay`` seconds.
+
+        Returns:
+            Timer: A handle that can cancel the callback.
+        """
+        timer = Timer(self.clock() + delay, callback, args)
+        with self.condition:
+            heapq.heappush(self.heap, (timer.when, next(self.counter), timer))
+            self.condition.notify()
+        return timer
+
+    def pop_due(self):
+        """Remove and return the timers that are due, in due order."""
+        due = []
+        now = self.clock()
+        with self.condition:
+            while self.heap and self.heap[0][0] <= now:
+                timer = heapq.heappop(self.heap)[2]
+                if not timer.cancelled:
+                    due.append(timer)
+        return due
+
+    def run_pending(self):
+        """Run every callback that is due."""
+        for timer in self.pop_due():
+            timer.callback(*timer.args)
+
+    def run_forever(self):
+        """Run callbacks as they fall due until ``stop`` is called."""
+        self.running = True
+        while self.running:
+            with self.condition:
+                if self.heap:
+                    delay = self.heap[0][0] - self.clock()
+                    if delay > 0:
+                        self.condition.wait(delay)
+                else:
+                    self.condition.wait()
+            self.run_pending()
+
+    def stop(self):
+        """Make ``run_forever`` return."""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
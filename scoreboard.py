@@ -0,0 +1,81 @@
+from bisect import bisect_left, insort
+
+from game_config import SCOREBOARD_ROWS
+
+
+class Scoreboard:
+    """
+    Player rankings kept in order as scores change.
+
+    The ranking is a list sorted by (-score, name, id), so a score change
+    moves one entry with two bisections instead of re-sorting every player
+    each frame.
+    """
+
+    def __init__(self, size=SCOREBOARD_ROWS):
+        """
+        Initialize an empty scoreboard.
+
+        Args:
+            size (int): The number of rows shown.
+        """
+        self.size = size
+        self.entries = {}
+        self.ranking = []
+
+    @staticmethod
+    def rank_key(player_id, name, score):
+        return (-score, name, player_id)
+
+    def remove(self, player_id):
+        """Drop a player from the ranking, ignoring unknown ids."""
+        entry = self.entries.pop(player_id, None)
+        if entry is not None:
+            key = self.rank_key(player_id, *entry)
+            del self.ranking[bisect_left(self.ranking, key)]
+
+    def update(self, scores):
+        """
+        Bring the ranking up to date, touching only players whose entry changed.
+
+        Args:
+            scores (dict): Mapping of player id to (name, score) for every
+                player in the game; players missing from it are removed.
+        """
+        for player_id in [p_id for p_id in self.entries if p_id not in scores]:
+            self.remove(player_id)
+        for player_id, entry in scores.items():
+            if self.entries.get(player_id) == entry:
+                continue
+            self.remove(player_id)
+            self.entries[player_id] = entry
+            insort(self.ranking, self.rank_key(player_id, *entry))
+
+    def rank(self, player_id):
+        """Return a player's 1-based rank, or None if they are not on the board."""
+        entry = self.entries.get(player_id)
+        if entry is None:
+            return None
+        return bisect_left(self.ranking, self.rank_key(player_id, *entry)) + 1
+
+    def rows(self, pinned_id=None):
+        """
+        Return the rows to show: the top players, with one player pinned.
+
+        If ``pinned_id`` ranks below the rows shown, it replaces the last row
+        so the local player always sees their own rank and score.
+
+        Args:
+            pinned_id (str, optional): The player to keep on the board.
+
+        Returns:
+            list: (rank, player id, name, score) for each row, best first.
+        """
+        rows = [
+            (rank, player_id, name, -negative_score)
+            for rank, (negative_score, name, player_id) in enumerate(self.ranking[: self.size], 1)
+        ]
+        rank = self.rank(pinned_id)
+        if rows and rank is not None and rank > self.size:
+            rows[-1] = (rank, pinned_id, *self.entries[pinned_id])
+        return rows
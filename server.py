@@ -1,198 +1,674 @@
-import socket
-import threading
-import uuid
-import pickle
-import random
-import time
-from player import Player
-from game_config import (
-    get_random_pos,
-    get_random_character,
-    generate_coin,
-    PLAYER_WIDTH,
-    PLAYER_HEIGHT,
-    COIN_RADIUS,
-    MAX_COINS,
-    MIN_GENERATE_INTERVAL,
-    MAX_GENERATE_INTERVAL,
-    SERVER,
-    PORT,
-    BUFFER_SIZE,
-    WINNING_POINTS,
-)
-
-# Global variables
-WINNER_FOUND = False
-WINNER_NAME = None
-COINS = []
-PLAYERS = {}
-coin_lock = threading.Lock()
-
-
-def check_for_winner():
-    """
-    Check if any player has reached the winning score.
-    If a winner is found, set the global variable WINNER_FOUND to True.
-    """
-    global WINNER_FOUND, WINNER_NAME
-    for player_id, player in PLAYERS.items():
-        if player.score >= WINNING_POINTS:
-            WINNER_FOUND = True
-            WINNER_NAME = player.name
-            return
-    WINNER_FOUND = False
-
-
-def check_winner_thread():
-    """Continuously check for a winner in a separate thread."""
-    while not WINNER_FOUND:
-        time.sleep(1)
-        check_for_winner()
-
-
-def generate_coins():
-    """Generate coins at random time intervals."""
-    global COINS
-    while not WINNER_FOUND:
-        if len(COINS) > MAX_COINS:
-            continue
-
-        time.sleep(random.randint(MIN_GENERATE_INTERVAL, MAX_GENERATE_INTERVAL))
-        coin = generate_coin()  # Generate a new coin
-        COINS.append(coin)  # Add the coin to the list
-
-
-def grab_coin(player):
-    """
-    Check if the player's rectangle coincides with any of the coins' circle,
-    return the multiplier of the coin, and delete the coin from the COINS.
-
-    Args:
-        player (Player): The player object.
-
-    Returns:
-        int: The multiplier of the coin (if any).
-    """
-    player_center = player.rect.center
-    multiplier = 0
-
-    # Acquire the lock
-    coin_lock.acquire()
-
-    try:
-        coins_to_remove = []  # Store indices of coins to be removed
-        for index, (coin_pos, coin_multiplier) in enumerate(COINS):
-            coin_center = coin_pos
-            coin_radius = COIN_RADIUS * coin_multiplier
-
-            # Calculate the squared distance between the player and the coin
-            dx = coin_center[0] - player_center[0]
-            dy = coin_center[1] - player_center[1]
-            distance_squared = dx * dx + dy * dy
-
-            # Calculate the squared sum of radii
-            sum_of_radii_squared = (player.rect.width / 2 + coin_radius) ** 2
-
-            # Check if the squared distance is less than or equal to the squared sum of radii
-            if distance_squared <= sum_of_radii_squared:
-                multiplier = coin_multiplier
-                coins_to_remove.append(index)  # Add index of coin to removal list
-
-        # Remove grabbed coins from COINS (in reverse order to avoid index shifting)
-        for index in reversed(coins_to_remove):
-            del COINS[index]
-    finally:
-        # Release the lock
-        coin_lock.release()
-
-    return multiplier
-
-
-def handle_client(conn, player_id):
-    """
-    Handle client connection.
-
-    Args:
-        conn (socket.socket): The client socket object.
-        player_id (str): The unique identifier for the player.
-    """
-    global WINNER_NAME
-    try:
-        # Send connected player's details
-        conn.send(pickle.dumps(PLAYERS[player_id]))
-
-        while True:
-            # Receive data from the client
-            data = conn.recv(BUFFER_SIZE)
-            if not data:
-                print("Player disconnected:", player_id)
-                break
-
-            try:
-                received_data = pickle.loads(data)
-                PLAYERS[player_id] = received_data
-
-                multiplier = grab_coin(PLAYERS[player_id])
-
-                # Send opponents' data to the player
-                opponents = {
-                    p_id: d for p_id, d in PLAYERS.items() if p_id != player_id
-                }
-                reply = {
-                    "winner": WINNER_NAME,
-                    "opponents": opponents,
-                    "coins": COINS,
-                    "multiplier": multiplier,
-                }
-                conn.sendall(pickle.dumps(reply))
-            except pickle.UnpicklingError:
-                print("Error: Invalid pickle data received")
-    except Exception as e:
-        print("Error:", str(e))
-    finally:
-        # Remove the disconnected player from opponents dictionary
-        if player_id in opponents:
-            del opponents[player_id]
-
-        del PLAYERS[player_id]
-        conn.close()
-
-
-def main():
-    """Main function to run the server."""
-    # Create a socket object
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-
-    try:
-        # Bind the socket to the server address and port
-        s.bind((SERVER, PORT))
-        print("Waiting for connections. Server started.")
-    except socket.error as e:
-        print("Error:", str(e))
-        return
-
-    # Start the winner checking thread
-    threading.Thread(target=check_winner_thread).start()
-    # Start the coin generation thread
-    threading.Thread(target=generate_coins).start()
-
-    while True:
-        # Listen for incoming connections
-        s.listen()
-        conn, addr = s.accept()
-        print("Connected to:", addr)
-
-        # Start a new thread to handle the client
-        player_id = str(uuid.uuid4())
-        PLAYERS[player_id] = Player(
-            player_id,
-            *get_random_pos(),
-            PLAYER_WIDTH,
-            PLAYER_HEIGHT,
-            get_random_character(),
-        )
-        threading.Thread(target=handle_client, args=(conn, player_id)).start()
-
-
-if __name__ == "__main__":
-    main()
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from functools import partial
+from multiprocessing.connection import wait
+from protocol import (
+    HEADER,
+    FrameReader,
+    ProtocolError,
+    MSG_INPUT,
+    read_frame,
+    read_frame_async,
+    iter_frames,
+    decode_datagram,
+    decode_input,
+)
+from scheduler import Scheduler
+from metrics import Metrics, serve_metrics
+from room import Input, Join, Leave, Room
+from outbox import Outbox, buffers_size
+from lobby import Lobby, follow_reports
+from game_config import (
+    PORT,
+    TICK_RATE,
+    ROOMS_PER_WORKER,
+    SERVER_ENV,
+    get_server_address,
+    max_inputs_per_tick,
+)
+
+# Global variables: the rooms hosted by this process and what they share
+ROOMS = {}
+METRICS = Metrics()
+METRICS.gauge("rooms", lambda: len(ROOMS))
+METRICS.gauge("players", lambda: sum(len(room.players) for room in list(ROOMS.values())))
+METRICS.gauge("coins", lambda: sum(len(room.coins) for room in list(ROOMS.values())))
+METRICS.gauge("commands_queued", lambda: sum(room.commands.qsize() for room in list(ROOMS.values())))
+METRICS.gauge("outbound_bytes", lambda: sum(outbox_depths()))
+METRICS.gauge("outbound_max_bytes", lambda: max(outbox_depths(), default=0))
+SCHEDULER = Scheduler()
+
+
+def open_room(room_id, listener=None, tick_rate=TICK_RATE):
+    """
+    Create a room in this process.
+
+    Args:
+        room_id (int): Identifies the room.
+        listener (callable, optional): Told about the room's player count and open state.
+        tick_rate (int): Ticks per second of the game loop running the room.
+
+    Returns:
+        Room: The new room.
+    """
+    room = ROOMS[room_id] = Room(room_id, SCHEDULER, METRICS, listener, tick_rate)
+    return room
+
+
+def outbox_depths():
+    """The bytes waiting to be sent to each connected player."""
+    return [
+        outbox.depth() for room in list(ROOMS.values()) for outbox in list(room.outboxes.values())
+    ]
+
+
+def shutdown_socket(conn):
+    """Wake the thread blocked reading ``conn`` by shutting the socket down."""
+    try:
+        conn.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def send_buffers(conn, buffers):
+    """
+    Send buffers back to back with a vectored write, without joining them first.
+
+    Args:
+        conn (socket.socket): A blocking, connected socket.
+        buffers (list): The bytes-like objects to send, in order.
+    """
+    if not hasattr(conn, "sendmsg"):
+        conn.sendall(b"".join(buffers))
+        return
+    views = [memoryview(buffer) for buffer in buffers]
+    while views:
+        sent = conn.sendmsg(views)
+        while views and sent >= len(views[0]):
+            sent -= len(views.pop(0))
+        if sent:
+            views[0] = views[0][sent:]
+
+
+def send_replies(conn, outbox, player_id):
+    """
+    Send a client's outbox over its socket until the outbox is closed.
+
+    Runs on its own thread, so a client that reads slowly blocks only this
+    thread; replies queued meanwhile replace each other in the outbox.
+
+    Args:
+        conn (socket.socket): The client socket object.
+        outbox (Outbox): The client's outbound queue.
+        player_id (str): The unique identifier for the player.
+    """
+    while True:
+        buffers = outbox.take()
+        if buffers is None:
+            return
+        try:
+            send_buffers(conn, buffers)
+        except OSError:
+            shutdown_socket(conn)
+            return
+        outbox.sent()
+        METRICS.transfer(player_id, sent=buffers_size(buffers))
+
+
+def handle_client(conn, room):
+    """
+    Handle client connection.
+
+    Client messages are only submitted to the room here; the room's own
+    thread applies them and queues the replies, which a sender thread sends.
+
+    Args:
+        conn (socket.socket): The client socket object.
+        room (Room): The room the player joins.
+    """
+    player_id = str(uuid.uuid4())
+    reader = FrameReader()
+    outbox = Outbox(METRICS)
+    sender = threading.Thread(target=send_replies, args=(conn, outbox, player_id), daemon=True)
+    room.submit(Join(player_id, outbox, partial(shutdown_socket, conn)))
+    try:
+        sender.start()
+        while True:
+            # Receive data from the client
+            received = reader.received
+            msg_type, payload = read_frame(conn, reader)
+            start = time.perf_counter()
+            METRICS.transfer(player_id, received=reader.received - received)
+            if msg_type != MSG_INPUT:
+                continue
+            ack, input_seq, _, keys = decode_input(payload)
+            room.submit(Input(player_id, ack, input_seq, keys))
+            METRICS.observe("handle_message", time.perf_counter() - start)
+    except ConnectionError:
+        print("Player disconnected:", player_id)
+    except Exception as e:
+        print("Error:", str(e))
+    finally:
+        room.submit(Leave(player_id))
+        outbox.close()
+        # wakes the sender if it is blocked on a client that stopped reading
+        shutdown_socket(conn)
+        if sender.is_alive():
+            sender.join()
+        # the sender may have counted bytes after the room dropped the connection
+        METRICS.drop_connection(player_id)
+        conn.close()
+
+
+def accept_players(sock, room):
+    """
+    Accept connections into a room, handling each client on its own thread.
+
+    Args:
+        sock (socket.socket): The room's listening socket.
+        room (Room): The room new players join.
+    """
+    while True:
+        conn, addr = sock.accept()
+        print("Connected to:", addr)
+
+        # Start a new thread to handle the client
+        threading.Thread(target=handle_client, args=(conn, room)).start()
+
+
+async def handle_client_async(room, reader, writer):
+    """
+    Handle a client connection on the event loop.
+
+    Client messages are only submitted to the room here; the game loop
+    applies them and sends every client in the room a snapshot each tick,
+    starting with the hello.
+
+    Args:
+        room (Room): The room the player joins.
+        reader (asyncio.StreamReader): The stream to read client messages from.
+        writer (asyncio.StreamWriter): The stream to write replies to.
+    """
+    print("Connected to:", writer.get_extra_info("peername"))
+    player_id = str(uuid.uuid4())
+    room.submit(Join(player_id, Outbox(METRICS), writer.close, writer))
+    try:
+        while True:
+            msg_type, payload = await read_frame_async(reader)
+            start = time.perf_counter()
+            METRICS.transfer(player_id, received=HEADER.size + len(payload))
+            if msg_type != MSG_INPUT:
+                continue
+            ack, input_seq, _, keys = decode_input(payload)
+            room.submit(Input(player_id, ack, input_seq, keys))
+            METRICS.observe("handle_message", time.perf_counter() - start)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        print("Player disconnected:", player_id)
+    except (ProtocolError, OSError) as e:
+        print("Error:", str(e))
+    finally:
+        room.submit(Leave(player_id))
+        writer.close()
+
+
+class DatagramEndpoint(asyncio.DatagramProtocol):
+    """
+    Receives the input datagrams of a room's UDP clients.
+
+    Datagrams with an unknown token or that fail to decode are dropped;
+    repeated and out-of-order inputs are discarded by the room.
+    """
+
+    def __init__(self, room):
+        self.room = room
+
+    def connection_made(self, transport):
+        self.room.datagram = transport
+
+    def datagram_received(self, data, addr):
+        start = time.perf_counter()
+        try:
+            token, frames = decode_datagram(data)
+            player_id = self.room.datagram_player(token)
+            if player_id is None:
+                return
+            METRICS.transfer(player_id, received=len(data))
+            for msg_type, payload in iter_frames(frames):
+                if msg_type == MSG_INPUT:
+                    ack, input_seq, _, keys = decode_input(payload)
+                    self.room.submit(Input(player_id, ack, input_seq, keys, addr))
+        except ProtocolError:
+            METRICS.count("bad_datagrams")
+            return
+        METRICS.observe("handle_datagram", time.perf_counter() - start)
+
+
+def run_tick(tick_rate=TICK_RATE):
+    """
+    Advance the simulation by one tick.
+
+    Runs due timers, then ticks every room in this process.
+
+    Args:
+        tick_rate (int): Simulation ticks per second; the slower the tick,
+            the more inputs each player may have applied in one.
+    """
+    SCHEDULER.run_pending()
+    limit = max_inputs_per_tick(tick_rate)
+    for room in list(ROOMS.values()):
+        room.run_tick(limit)
+
+
+async def game_loop(tick_rate=TICK_RATE):
+    """
+    Run the simulation at a fixed tick rate.
+
+    A tick that raises is logged and counted, and the loop carries on with
+    the next one rather than leaving every room in the process frozen.
+
+    Args:
+        tick_rate (int): Simulation ticks per second.
+    """
+    loop = asyncio.get_running_loop()
+    interval = 1 / tick_rate
+    next_tick = loop.time()
+    while True:
+        try:
+            run_tick(tick_rate)
+        except Exception as e:
+            print("Error: tick failed:", repr(e))
+            METRICS.count("tick_errors")
+        next_tick += interval
+        delay = next_tick - loop.time()
+        if delay < 0:
+            # Running behind: skip the missed ticks instead of bursting
+            next_tick = loop.time()
+            delay = 0
+        await asyncio.sleep(delay)
+
+
+def log_stats(interval):
+    """Print the server metrics as one JSON line, every ``interval`` seconds."""
+    print(json.dumps(METRICS.snapshot()), flush=True)
+    SCHEDULER.call_later(interval, log_stats, interval)
+
+
+def start_monitoring(metrics_port=None, stats_interval=None):
+    """
+    Expose the server metrics.
+
+    Args:
+        metrics_port (int, optional): Serve /metrics and /json on this local port.
+        stats_interval (float, optional): Print a JSON stats line this often, in seconds.
+    """
+    if metrics_port:
+        try:
+            serve_metrics(METRICS, "127.0.0.1", metrics_port)
+            print(f"Metrics at http://127.0.0.1:{metrics_port}/metrics")
+        except OSError as e:
+            print("Error:", str(e))
+    if stats_interval:
+        SCHEDULER.call_later(stats_interval, log_stats, stats_interval)
+
+
+def raise_fd_limit():
+    """Raise the soft open-file limit to the hard limit, where supported."""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def listen(host, port):
+    """
+    Open a listening TCP socket.
+
+    Args:
+        host (str): The address to bind to.
+        port (int): The port to listen on.
+
+    Returns:
+        socket.socket: The bound, listening socket.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if os.name == "posix":
+        # rebind despite connections the lobby closed lingering in TIME_WAIT
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        sock.bind((host, port))
+        sock.listen(socket.SOMAXCONN)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def listen_server(host, port):
+    """
+    Open the server's listening socket on ``host``, or on the resolved server address.
+
+    A resolved address may come from the cache and belong to a network this
+    host has since left; if it cannot be bound, the address is detected
+    again, which also replaces the cached one.
+
+    Args:
+        host (str): The address to bind to, or None to use get_server_address.
+        port (int): The port to listen on.
+
+    Returns:
+        socket.socket: The bound, listening socket.
+    """
+    if host is not None:
+        return listen(host, port)
+    host = get_server_address()
+    try:
+        return listen(host, port)
+    except OSError as e:
+        if os.environ.get(SERVER_ENV):
+            raise
+        detected = get_server_address(refresh=True)
+        if not detected or detected == host:
+            raise
+        print(f"Error: cannot bind to {host} ({e}), using {detected}")
+        return listen(detected, port)
+
+
+def serve_threaded(rooms):
+    """
+    Serve rooms with a thread per room and per client; the calling thread runs the timers.
+
+    Args:
+        rooms (list): (Room, listening socket) pairs.
+    """
+    for room, sock in rooms:
+        room.start()
+        threading.Thread(target=room.serve).start()
+        threading.Thread(target=accept_players, args=(sock, room)).start()
+    SCHEDULER.run_forever()
+
+
+async def serve_async(rooms, tick_rate=TICK_RATE, udp=False):
+    """
+    Serve rooms from one event loop that owns all their connection I/O.
+
+    Args:
+        rooms (list): (Room, listening socket) pairs.
+        tick_rate (int): Simulation ticks per second.
+        udp (bool): Also accept inputs and send snapshots as datagrams on
+            each room's port.
+    """
+    loop = asyncio.get_running_loop()
+    servers = []
+    for room, sock in rooms:
+        room.start()
+        if udp:
+            await loop.create_datagram_endpoint(
+                partial(DatagramEndpoint, room), local_addr=sock.getsockname()[:2]
+            )
+        servers.append(
+            await asyncio.start_server(
+                partial(handle_client_async, room), sock=sock, backlog=socket.SOMAXCONN
+            )
+        )
+    loop_task = asyncio.create_task(game_loop(tick_rate))
+    try:
+        await asyncio.gather(*(server.serve_forever() for server in servers))
+    finally:
+        loop_task.cancel()
+
+
+async def main_async(host=None, port=PORT, tick_rate=TICK_RATE, udp=False):
+    """
+    Run the server with a single asyncio event loop owning all connection I/O.
+
+    Args:
+        host (str): The address to bind to; resolved with get_server_address if omitted.
+        port (int): The port to listen on.
+        tick_rate (int): Simulation ticks per second.
+        udp (bool): Offer clients inputs and snapshots over UDP on the same port.
+    """
+    raise_fd_limit()
+    try:
+        sock = listen_server(host, port)
+    except OSError as e:
+        print("Error:", str(e))
+        return
+    print("Waiting for connections. Server started (asyncio).")
+    await serve_async([(open_room(1, tick_rate=tick_rate), sock)], tick_rate, udp)
+
+
+def main(host=None, port=PORT):
+    """Main function to run the server."""
+    try:
+        # Bind the socket to the server address and port
+        sock = listen_server(host, port)
+        print("Waiting for connections. Server started.")
+    except OSError as e:
+        print("Error:", str(e))
+        return
+    serve_threaded([(open_room(1), sock)])
+
+
+def report_room(events, room):
+    """Tell the lobby how many players a room has and whether it is open."""
+    events.put((room.id, len(room.players), room.is_open()))
+
+
+def exit_with_parent():
+    """Exit this worker process as soon as the lobby process is gone."""
+    wait([multiprocessing.parent_process().sentinel])
+    print("Lobby exited, stopping worker")
+    os._exit(0)
+
+
+def run_worker(
+    host, rooms, mode, tick_rate, events, metrics_port=None, stats_interval=None, udp=False
+):
+    """
+    Worker process: host some of the lobby's rooms.
+
+    Every room is reported on ``events`` once it is listening and again
+    whenever its player count or open state changes.
+
+    Args:
+        host (str): The address to bind to.
+        rooms (list): (room id, port) of each room to host.
+        mode (str): "threaded" or "asyncio".
+        tick_rate (int): Simulation ticks per second in asyncio mode.
+        events (multiprocessing.Queue): Receives (room id, players, is open) reports.
+        metrics_port (int, optional): Serve this worker's metrics on this local port.
+        stats_interval (float, optional): Print a JSON stats line this often, in seconds.
+        udp (bool): Offer UDP to the rooms' clients (asyncio mode).
+    """
+    threading.Thread(target=exit_with_parent, daemon=True).start()
+    start_monitoring(metrics_port, stats_interval)
+    if mode == "asyncio":
+        raise_fd_limit()
+    else:
+        # threaded rooms answer each input instead of ticking
+        tick_rate = TICK_RATE
+    hosted = [
+        (open_room(room_id, partial(report_room, events), tick_rate), listen(host, port))
+        for room_id, port in rooms
+    ]
+    for room, _ in hosted:
+        room.notify()
+    if mode == "asyncio":
+        asyncio.run(serve_async(hosted, tick_rate, udp))
+    else:
+        serve_threaded(hosted)
+
+
+def main_lobby(
+    host=None,
+    port=PORT,
+    mode="threaded",
+    workers=2,
+    rooms_per_worker=ROOMS_PER_WORKER,
+    tick_rate=TICK_RATE,
+    metrics_port=None,
+    stats_interval=None,
+    udp=False,
+):
+    """
+    Run a lobby on ``port`` that shares players out over rooms in worker processes.
+
+    Room ``n`` listens on ``port + n``. Consecutive rooms are hosted by
+    different workers, so the lobby, which fills rooms in order, spreads
+    matches over every worker.
+
+    Args:
+        host (str): The address to bind to; resolved with get_server_address if omitted.
+        port (int): The lobby's port.
+        mode (str): The connection handling engine of the workers.
+        workers (int): Worker processes to start.
+        rooms_per_worker (int): Rooms hosted by each worker.
+        tick_rate (int): Simulation ticks per second in asyncio mode.
+        metrics_port (int, optional): Worker ``i`` serves its metrics on this port + i.
+        stats_interval (float, optional): Each worker prints a JSON stats line this often.
+        udp (bool): Offer UDP to clients of every room (asyncio mode).
+    """
+    try:
+        sock = listen_server(host, port)
+    except OSError as e:
+        print("Error:", str(e))
+        return
+    # the rooms bind to whichever address the lobby ended up on
+    host = sock.getsockname()[0]
+
+    rooms = {}
+    assignments = [[] for _ in range(workers)]
+    for index in range(workers * rooms_per_worker):
+        room_id = index + 1
+        rooms[room_id] = port + room_id
+        assignments[index % workers].append((room_id, port + room_id))
+    # spawn, not fork, so workers inherit neither the lobby socket nor each
+    # other's pipes and notice when the lobby exits
+    context = multiprocessing.get_context("spawn")
+    events = context.Queue()
+    processes = []
+    for index, assigned in enumerate(assignments):
+        process = context.Process(
+            target=run_worker,
+            args=(
+                host,
+                assigned,
+                mode,
+                tick_rate,
+                events,
+                metrics_port + index if metrics_port else None,
+                stats_interval,
+                udp,
+            ),
+            daemon=True,
+        )
+        process.start()
+        processes.append(process)
+
+    # Wait for every room to report that it is listening
+    lobby = Lobby(rooms)
+    waiting = set(rooms)
+    while waiting:
+        try:
+            report = events.get(timeout=1)
+        except queue.Empty:
+            if not all(process.is_alive() for process in processes):
+                print("Error: a worker exited during startup")
+                return
+            continue
+        lobby.update(*report)
+        waiting.discard(report[0])
+    threading.Thread(target=follow_reports, args=(lobby, events), daemon=True).start()
+
+    print(f"Waiting for connections. Server started (lobby, {workers} workers, {len(rooms)} rooms).")
+    lobby.serve(sock)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Coin-Base game server.")
+    parser.add_argument(
+        "--mode",
+        choices=("threaded", "asyncio"),
+        default="threaded",
+        help="connection handling engine (default: threaded)",
+    )
+    parser.add_argument(
+        "--host",
+        help="address to bind to (default: $COIN_BASE_SERVER, else the cached or detected LAN address)",
+    )
+    parser.add_argument("--port", type=int, default=PORT, help="port to listen on")
+    parser.add_argument(
+        "--tick-rate",
+        type=int,
+        default=TICK_RATE,
+        help=f"simulation ticks per second in asyncio mode (default: {TICK_RATE})",
+    )
+    parser.add_argument(
+        "--udp",
+        action="store_true",
+        help="also exchange inputs and snapshots with clients over UDP on the same port (asyncio mode)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="run a lobby on --port and host rooms in this many worker processes "
+        "(default: 0, a single room in this process)",
+    )
+    parser.add_argument(
+        "--rooms-per-worker",
+        type=int,
+        default=ROOMS_PER_WORKER,
+        help=f"rooms hosted by each worker (default: {ROOMS_PER_WORKER})",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="serve metrics over HTTP on this port on 127.0.0.1 (/metrics text, /json); "
+        "with --workers, worker i uses this port + i",
+    )
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        help="print a JSON stats line every this many seconds",
+    )
+    args = parser.parse_args()
+    if args.udp and args.mode != "asyncio":
+        parser.error("--udp requires --mode asyncio")
+    # the hello carries the tick rate as a uint16
+    if not 1 <= args.tick_rate <= 65535:
+        parser.error("--tick-rate must be between 1 and 65535")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.workers:
+        main_lobby(
+            args.host,
+            args.port,
+            args.mode,
+            args.workers,
+            args.rooms_per_worker,
+            args.tick_rate,
+            args.metrics_port,
+            args.stats_interval,
+            args.udp,
+        )
+    else:
+        start_monitoring(args.metrics_port, args.stats_interval)
+        if args.mode == "asyncio":
+            asyncio.run(main_async(args.host, args.port, args.tick_rate, args.udp))
+        else:
+            main(args.host, args.port)
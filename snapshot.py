@@ -0,0 +1,211 @@
+from collections import OrderedDict, deque, namedtuple
+
+from game_config import SNAPSHOT_BUFFER, SNAPSHOT_HISTORY
+
+# players: player id -> (x, y, score, direction, character, color)
+# coins: coin id -> ((x, y), multiplier)
+WorldState = namedtuple("WorldState", ["players", "coins"])
+
+# added_players: [(id, x, y, score, direction, character, color)]
+# updated_players: [(id, x, y, score, direction)]
+# removed_players: [id]
+# added_coins: [(id, x, y, multiplier)]
+# removed_coins: [id]
+Delta = namedtuple(
+    "Delta",
+    ["added_players", "updated_players", "removed_players", "added_coins", "removed_coins"],
+)
+
+EMPTY_STATE = WorldState({}, {})
+
+
+def capture_state(players, coins):
+    """
+    Capture the parts of the world sent to clients.
+
+    Args:
+        players (iterable): The PlayerState or Player objects in the game.
+        coins (dict): Mapping of coin id to ((x, y), multiplier).
+
+    Returns:
+        WorldState: An immutable-by-convention copy of the world.
+    """
+    return WorldState(
+        {
+            player.id: (
+                player.x,
+                player.y,
+                player.score,
+                player.direction,
+                player.character,
+                player.color,
+            )
+            for player in players
+        },
+        dict(coins),
+    )
+
+
+def diff_states(base, state):
+    """
+    Compute the changes that turn ``base`` into ``state``.
+
+    Args:
+        base (WorldState or None): The state the client has acknowledged, or
+            None to produce a keyframe.
+        state (WorldState): The current state.
+
+    Returns:
+        Delta: Added, updated and removed players and coins.
+    """
+    if base is None:
+        base = EMPTY_STATE
+    added_players = []
+    updated_players = []
+    for player_id, record in state.players.items():
+        base_record = base.players.get(player_id)
+        if base_record is None:
+            added_players.append((player_id, *record))
+        elif record[:4] != base_record[:4]:
+            updated_players.append((player_id, *record[:4]))
+    removed_players = [p_id for p_id in base.players if p_id not in state.players]
+
+    added_coins = [
+        (coin_id, x, y, multiplier)
+        for coin_id, ((x, y), multiplier) in state.coins.items()
+        if coin_id not in base.coins
+    ]
+    removed_coins = [coin_id for coin_id in base.coins if coin_id not in state.coins]
+    return Delta(added_players, updated_players, removed_players, added_coins, removed_coins)
+
+
+def apply_delta(base, delta):
+    """
+    Apply a delta to a state, returning the new state.
+
+    Args:
+        base (WorldState or None): The state the delta was computed against,
+            or None for a keyframe.
+        delta (Delta): The decoded changes.
+
+    Returns:
+        WorldState: The resulting state; ``base`` is left untouched.
+    """
+    if base is None:
+        base = EMPTY_STATE
+    players = dict(base.players)
+    for player_id in delta.removed_players:
+        players.pop(player_id, None)
+    for player_id, *record in delta.added_players:
+        players[player_id] = tuple(record)
+    for player_id, x, y, score, direction in delta.updated_players:
+        character, color = players[player_id][4:]
+        players[player_id] = (x, y, score, direction, character, color)
+
+    coins = dict(base.coins)
+    for coin_id in delta.removed_coins:
+        coins.pop(coin_id, None)
+    for coin_id, x, y, multiplier in delta.added_coins:
+        coins[coin_id] = ((x, y), multiplier)
+    return WorldState(players, coins)
+
+
+class SnapshotHistory:
+    """A bounded record of recent world states, keyed by snapshot sequence."""
+
+    def __init__(self, size=SNAPSHOT_HISTORY):
+        """
+        Initialize an empty history.
+
+        Args:
+            size (int): The number of snapshots to keep.
+        """
+        self.size = size
+        self.states = OrderedDict()
+
+    def record(self, seq, state):
+        """Store the state sent as snapshot ``seq``, evicting the oldest."""
+        self.states[seq] = state
+        while len(self.states) > self.size:
+            self.states.popitem(last=False)
+
+    def get(self, seq):
+        """Return the state for ``seq``, or None if unknown or evicted."""
+        return self.states.get(seq)
+
+    def discard_before(self, seq):
+        """Forget every state older than ``seq``."""
+        while self.states and next(iter(self.states)) < seq:
+            self.states.popitem(last=False)
+
+
+def interpolate_players(older, newer, t):
+    """
+    Blend player positions between two world states.
+
+    Players missing from ``older`` are placed at their ``newer`` position;
+    everything but x and y is taken from ``newer``.
+
+    Args:
+        older (WorldState): The earlier state.
+        newer (WorldState): The later state.
+        t (float): How far between the two states to sample, from 0 to 1.
+
+    Returns:
+        dict: Mapping of player id to (x, y, score, direction, character, color).
+    """
+    players = {}
+    for player_id, record in newer.players.items():
+        base = older.players.get(player_id)
+        if base is None:
+            players[player_id] = record
+            continue
+        x = base[0] + (record[0] - base[0]) * t
+        y = base[1] + (record[1] - base[1]) * t
+        players[player_id] = (x, y, *record[2:])
+    return players
+
+
+class SnapshotBuffer:
+    """The world states most recently received by a client, stamped with their arrival time."""
+
+    def __init__(self, size=SNAPSHOT_BUFFER):
+        """
+        Initialize an empty buffer.
+
+        Args:
+            size (int): The number of states to keep.
+        """
+        self.entries = deque(maxlen=size)
+
+    def push(self, received_at, state):
+        """Add a state received at ``received_at``, evicting the oldest."""
+        self.entries.append((received_at, state))
+
+    def sample(self, render_time):
+        """
+        Interpolate player records at a point in time.
+
+        Times before the oldest or after the newest state are clamped to that
+        state; positions are never extrapolated.
+
+        Args:
+            render_time (float): The time to sample, on the clock used by ``push``.
+
+        Returns:
+            dict: Mapping of player id to (x, y, score, direction, character, color).
+        """
+        entries = self.entries
+        if not entries:
+            return {}
+        if render_time <= entries[0][0]:
+            return entries[0][1].players
+        for index in range(len(entries) - 1, 0, -1):
+            older_time, older = entries[index - 1]
+            if older_time <= render_time:
+                newer_time, newer = entries[index]
+                if render_time >= newer_time:
+                    return newer.players
+                t = (render_time - older_time) / (newer_time - older_time)
+                return interpolate_players(older, newer, t)
+        return entries[-1][1].players
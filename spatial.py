@@ -0,0 +1,78 @@
+from game_config import COIN_GRID_CELL_SIZE
+
+
+class CoinGrid:
+    """
+    A uniform grid index over the coin field.
+
+    Each coin is registered in every cell its bounding box overlaps, so a
+    pickup query only has to look at the cells the player's rect overlaps.
+    With the default cell size a coin or a player spans at most 2x2 cells,
+    which keeps insert, remove and query O(1).
+    """
+
+    def __init__(self, cell_size=COIN_GRID_CELL_SIZE):
+        """
+        Initialize an empty grid.
+
+        Args:
+            cell_size (int): The width and height of a cell in pixels.
+        """
+        self.cell_size = cell_size
+        self.cells = {}
+        self.coin_cells = {}
+
+    def cells_for(self, left, top, right, bottom):
+        """Return the keys of the cells overlapping a bounding box."""
+        size = self.cell_size
+        return [
+            (cx, cy)
+            for cx in range(int(left // size), int(right // size) + 1)
+            for cy in range(int(top // size), int(bottom // size) + 1)
+        ]
+
+    def insert(self, coin_id, center, radius):
+        """
+        Add a coin to the grid.
+
+        Args:
+            coin_id (int): The coin's id.
+            center (tuple): The coin's center (x, y).
+            radius (float): The coin's radius.
+        """
+        x, y = center
+        keys = self.cells_for(x - radius, y - radius, x + radius, y + radius)
+        for key in keys:
+            self.cells.setdefault(key, set()).add(coin_id)
+        self.coin_cells[coin_id] = keys
+
+    def remove(self, coin_id):
+        """Remove a coin from the grid, ignoring unknown ids."""
+        for key in self.coin_cells.pop(coin_id, ()):
+            cell = self.cells[key]
+            cell.discard(coin_id)
+            if not cell:
+                del self.cells[key]
+
+    def query(self, left, top, right, bottom):
+        """
+        Find the coins that may touch a rectangle.
+
+        Args:
+            left (float): The left edge of the area to search.
+            top (float): The top edge of the area to search.
+            right (float): The right edge of the area to search.
+            bottom (float): The bottom edge of the area to search.
+
+        Returns:
+            set: The ids of coins registered in the cells the area overlaps.
+        """
+        found = set()
+        for key in self.cells_for(left, top, right, bottom):
+            cell = self.cells.get(key)
+            if cell:
+                found |= cell
+        return found
+
+    def __len__(self):
+        return len(self.coin_cells)
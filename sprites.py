@@ -0,0 +1,62 @@
+import pygame
+
+
+class SpriteAtlas:
+    """
+    Many small sprites packed into one surface.
+
+    Sprites are placed on shelves, tallest first, and served as subsurfaces
+    of the atlas, so every blit reads from the same pixel buffer. Each sprite
+    carries an anchor: the offset from the point it is drawn at to its
+    top-left corner.
+    """
+
+    def __init__(self, sprites, width=512):
+        """
+        Pack sprites into a new atlas.
+
+        Args:
+            sprites (dict): Mapping of name to (surface, anchor), where anchor
+                is an (x, y) offset.
+            width (int): The width of the atlas; wider sprites get their own shelf.
+        """
+        regions = {}
+        x = y = shelf_height = 0
+        order = sorted(sprites, key=lambda name: sprites[name][0].get_height(), reverse=True)
+        for name in order:
+            w, h = sprites[name][0].get_size()
+            if x and x + w > width:
+                x, y, shelf_height = 0, y + shelf_height, 0
+            regions[name] = pygame.Rect(x, y, w, h)
+            x += w
+            shelf_height = max(shelf_height, h)
+
+        size = (
+            max([width] + [rect.right for rect in regions.values()]),
+            max(1, y + shelf_height),
+        )
+        atlas = pygame.Surface(size, pygame.SRCALPHA)
+        for name, rect in regions.items():
+            atlas.blit(sprites[name][0], rect)
+        if pygame.display.get_surface() is not None:
+            # match the display's pixel format so blits need no conversion
+            atlas = atlas.convert_alpha()
+        self.surface = atlas
+        self.sprites = {
+            name: (atlas.subsurface(rect), sprites[name][1]) for name, rect in regions.items()
+        }
+
+    def get(self, name):
+        """
+        Return a sprite and its anchor.
+
+        Returns:
+            tuple: (pygame.Surface, (x, y)) for ``name``.
+        """
+        return self.sprites[name]
+
+    def __contains__(self, name):
+        return name in self.sprites
+
+    def __len__(self):
+        return len(self.sprites)